@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Pagination with a bounded LRU cache of page responses
+"""
+
+import math
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+BaseServer = __import__('23-combined_pagination').Server
+
+
+ROW_OVERHEAD = 64
+FIELD_OVERHEAD = 50
+
+
+def weigh(rows: List[List]) -> int:
+    """
+    Roughly estimate the memory held by a list of rows of str.
+
+    Args:
+        rows: The rows of a page
+
+    Returns:
+        int: Estimated size in bytes
+    """
+    return sum(ROW_OVERHEAD + sum(FIELD_OVERHEAD + len(field)
+                                  for field in row)
+               for row in rows)
+
+
+class ResponseCache:
+    """LRU cache of page responses bounded both in entries and in bytes.
+
+    An entry may carry the span [start, stop) of row positions it was
+    built from, so that deleting rows only drops the entries covering
+    them.
+    """
+
+    def __init__(self, max_entries: int = 1024,
+                 max_bytes: int = 16 * 1024 * 1024):
+        """
+        Initialize an empty ResponseCache.
+
+        Args:
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum estimated size of all cached responses
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.__entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a response, marking it as the most recently used.
+
+        Returns:
+            Optional[Any]: The cached response, or None on a miss
+        """
+        entry = self.__entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.__entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int,
+            span: Tuple[int, int] = None) -> None:
+        """
+        Cache a response, evicting the least recently used ones to make
+        room. Responses larger than the whole cache are not kept.
+
+        Args:
+            key: The request the response answers
+            value: The response
+            size: Estimated size of the response in bytes
+            span: Row positions [start, stop) the response depends on
+        """
+        self.pop(key)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        self.__entries[key] = (value, size, span)
+        self.size += size
+        while (len(self.__entries) > self.max_entries
+               or self.size > self.max_bytes):
+            _, (_, evicted, _) = self.__entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> bool:
+        """
+        Drop one entry.
+
+        Returns:
+            bool: True if the entry was cached
+        """
+        entry = self.__entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= entry[1]
+        return True
+
+    def invalidate(self, positions: Iterable[int]) -> int:
+        """
+        Drop every entry whose span covers one of the given positions.
+
+        Args:
+            positions: Row positions that changed
+
+        Returns:
+            int: Number of entries dropped
+        """
+        positions = sorted(positions)
+        if not positions:
+            return 0
+        stale = []
+        for key, (_, _, span) in self.__entries.items():
+            if span is None:
+                continue
+            i = bisect_left(positions, span[0])
+            if i < len(positions) and positions[i] < span[1]:
+                stale.append(key)
+        for key in stale:
+            self.pop(key)
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop every entry
+        """
+        self.__entries.clear()
+        self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Counters describing how well the cache is doing
+        """
+        return {
+            'entries': len(self.__entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+class Server(BaseServer):
+    """Server class to paginate a database of popular baby names,
+    caching the responses of recent requests.
+
+    Cached responses are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_entries: int = 1024,
+                 max_bytes: int = 16 * 1024 * 1024):
+        """
+        Initialize the Server and its cache.
+
+        Args:
+            max_entries: Maximum number of cached responses, 0 to disable
+            max_bytes: Maximum estimated size of the cached responses
+        """
+        super().__init__()
+        self.cache = ResponseCache(max_entries, max_bytes)
+
+    def get_page(self, page: int = 1, page_size: int = 10) -> List[List]:
+        """
+        Get a page from the dataset, from the cache when possible
+        """
+        # Checked first, as 1.0 would otherwise hit the entry of 1
+        assert isinstance(page, int) and page > 0
+        assert isinstance(page_size, int) and page_size > 0
+
+        key = ('page', page, page_size)
+        data = self.cache.get(key)
+        if data is None:
+            data = super().get_page(page, page_size)
+            self.cache.put(key, data, weigh(data))
+        return data
+
+    def get_hyper(self, page: int = 1, page_size: int = 10) -> Dict:
+        """
+        Get hypermedia pagination information, from the cache when possible
+        """
+        assert isinstance(page, int) and page > 0
+        assert isinstance(page_size, int) and page_size > 0
+
+        key = ('hyper', page, page_size)
+        hyper = self.cache.get(key)
+        if hyper is None:
+            # Built from the uncached page, as going through get_page
+            # would count a second lookup and weigh the rows twice
+            data = super().get_page(page, page_size)
+            total_pages = math.ceil(len(self.dataset()) / page_size)
+            hyper = {
+                'page_size': len(data),
+                'page': page,
+                'data': data,
+                'next_page': page + 1 if page < total_pages else None,
+                'prev_page': page - 1 if page > 1 else None,
+                'total_pages': total_pages
+            }
+            self.cache.put(key, hyper, weigh(data))
+        return hyper
+
+    def get_hyper_index(self, index: int = None, page_size: int = 10) -> Dict:
+        """
+        Get deletion-resilient hypermedia pagination information, from the
+        cache when possible
+        """
+        assert index is None or (isinstance(index, int) and index >= 0)
+        assert isinstance(page_size, int) and page_size > 0
+
+        key = ('index', 0 if index is None else index, page_size)
+        hyper = self.cache.get(key)
+        if hyper is None:
+            hyper = super().get_hyper_index(index, page_size)
+            stop = hyper['next_index']
+            if stop is None:
+                stop = len(self.live_index())
+            self.cache.put(key, hyper, weigh(hyper['data']),
+                           span=(hyper['index'], stop))
+        return hyper
+
+    def extend(self, rows: List[List]) -> None:
+        """
+        Append rows and drop every cached response, since page counts and
+        trailing pages change
+        """
+        super().extend(rows)
+        self.cache.clear()
+
+    def reset(self) -> None:
+        """
+        Forget the loaded dataset, its indexes and the cached responses
+        """
+        super().reset()
+        self.cache.clear()
+
+    def delete(self, index: int) -> bool:
+        """
+        Delete a row and drop the cached pages that contained it
+        """
+        deleted = super().delete(index)
+        if deleted:
+            self.cache.invalidate((index,))
+        return deleted
+
+    def delete_many(self, indexes: Iterable[int]) -> int:
+        """
+        Delete several rows and drop the cached pages that contained them
+        """
+        indexes = list(indexes)
+        count = sum(super(Server, self).delete(index) for index in indexes)
+        if count:
+            self.cache.invalidate(indexes)
+        return count
+
+
+if __name__ == "__main__":
+    server = Server(max_entries=2)
+
+    print(server.get_hyper(1, 2))
+    print(server.get_hyper(1, 2) is server.get_hyper(1, 2))
+    res = server.get_hyper_index(3, 2)
+    print(res)
+    server.delete(res['index'])
+    print(server.get_hyper_index(3, 2))
+    print(server.cache.stats())
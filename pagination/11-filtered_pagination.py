@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Filtered and sorted pagination through secondary column indexes
+"""
+
+import array
+import collections
+import csv
+import heapq
+import itertools
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+index_range = __import__('0-simple_helper_function').index_range
+CachedServer = __import__('10-cached_pagination').Server
+
+
+def field(row: List[str], number: int) -> Optional[str]:
+    """
+    Value of a column in a row, None when the row is too short to hold
+    it, as blank and ragged rows are.
+    """
+    return row[number] if number < len(row) else None
+
+
+def sort_key(value: Optional[str]) -> Tuple[int, Any]:
+    """
+    Order integers numerically and before any other string, and missing
+    values last.
+    """
+    if value is None:
+        return (2, '')
+    if value.isdigit():
+        return (0, int(value))
+    return (1, value)
+
+
+def rank_values(postings: Dict[str, array.array], size: int) -> array.array:
+    """
+    Rank every row by its value in sort order.
+
+    Args:
+        postings: Row positions of each distinct value
+        size: Number of rows
+
+    Returns:
+        array.array: The rank of each row's value, rows whose values have
+        equal sort keys sharing a rank
+    """
+    ranks = array.array('I', bytes(4 * size))
+    groups = itertools.groupby(sorted(postings, key=sort_key), key=sort_key)
+    for rank, (_, values) in enumerate(groups):
+        for value in values:
+            for position in postings[value]:
+                ranks[position] = rank
+    return ranks
+
+
+def sorted_positions(postings: Dict[str, array.array],
+                     descending: bool = False) -> array.array:
+    """
+    Order every row by its value, rows with equal sort keys staying in
+    dataset order whichever the direction.
+
+    Args:
+        postings: Row positions of each distinct value
+        descending: Sort from largest to smallest
+
+    Returns:
+        array.array: The row positions in sort order
+    """
+    order = array.array('I')
+    values = sorted(postings, key=sort_key, reverse=descending)
+    for _, group in itertools.groupby(values, key=sort_key):
+        lists = [postings[value] for value in group]
+        order.extend(lists[0] if len(lists) == 1 else heapq.merge(*lists))
+    return order
+
+
+class Server(CachedServer):
+    """Server class to paginate a database of popular baby names,
+    with secondary indexes for filtered and sorted queries.
+    """
+
+    def __init__(self, *args, max_queries: int = 64, **kwargs):
+        """
+        Initialize the Server.
+
+        Args:
+            max_queries: Number of filtered query results kept (default: 64)
+        """
+        super().__init__(*args, **kwargs)
+        assert isinstance(max_queries, int) and max_queries > 0
+        self.max_queries = max_queries
+        self.__header = None
+        self.__postings = {}
+        self.__ranks = {}
+        self.__orders = {}
+        self.__queries = collections.OrderedDict()
+
+    def header(self) -> List[str]:
+        """Cached column names
+        """
+        if self.__header is None:
+            with open(self.DATA_FILE) as f:
+                self.__header = next(csv.reader(f), [])
+        return self.__header
+
+    def column_number(self, column: str) -> int:
+        """
+        Position of a column in each row.
+
+        Args:
+            column (str): Column name as found in the header
+        """
+        header = self.header()
+        assert column in header, "unknown column {}".format(column)
+        return header.index(column)
+
+    def create_index(self, column: str) -> None:
+        """
+        Build the secondary index of a column.
+
+        Two structures are kept: a posting list of row positions for every
+        distinct value, rows missing the column being listed under None,
+        used to filter, and the rank of every row's value
+        in the column's sort order, used to sort. Rows with equal sort
+        keys share a rank, so they stay in dataset order whichever the
+        direction of the sort.
+
+        Args:
+            column (str): Column name as found in the header
+        """
+        number = self.column_number(column)
+        if number in self.__postings:
+            return
+
+        dataset = self.dataset()
+        postings: Dict[str, array.array] = {}
+        for position, row in enumerate(dataset):
+            postings.setdefault(field(row, number),
+                                array.array('I')).append(position)
+
+        self.__postings[number] = postings
+        self.__ranks[number] = rank_values(postings, len(dataset))
+
+    def extend(self, rows: List[List]) -> None:
+        """
+        Append rows and add them to the secondary indexes, in place.
+
+        A column's ranks are only recomputed when the new rows bring values
+        it did not hold yet. Sort orders and query results are rebuilt on
+        their next use.
+
+        Args:
+            rows (List[List]): The new rows
+        """
+        start = len(self.dataset())
+        super().extend(rows)
+        size = len(self.dataset())
+        self.__orders = {}
+        self.__queries.clear()
+
+        for number, postings in self.__postings.items():
+            ranks = self.__ranks[number]
+            new_values = False
+            for position, row in enumerate(rows, start):
+                value = field(row, number)
+                if value not in postings:
+                    postings[value] = array.array('I')
+                    new_values = True
+                postings[value].append(position)
+            if new_values:
+                self.__ranks[number] = rank_values(postings, size)
+            else:
+                ranks.extend(ranks[postings[field(row, number)][0]]
+                             for row in rows)
+
+    def reset(self) -> None:
+        """Forget the loaded dataset and every index built on it
+        """
+        super().reset()
+        self.__postings = {}
+        self.__ranks = {}
+        self.__orders = {}
+        self.__queries.clear()
+
+    def sort_order(self, sort: str = None,
+                   descending: bool = False) -> Sequence[int]:
+        """
+        Positions of every row in the sort order of a column.
+
+        Orders are kept apart from the response cache, so page traffic
+        never evicts them, until the dataset changes.
+
+        Args:
+            sort (str): Column to sort by (default: None, dataset order)
+            descending (bool): Sort from largest to smallest
+
+        Returns:
+            Sequence[int]: The row positions in sort order
+        """
+        number = None if sort is None else self.column_number(sort)
+        order = self.__orders.get((number, descending))
+        if order is None:
+            size = len(self.dataset())
+            if number is None:
+                order = range(size - 1, -1, -1) if descending else range(size)
+            else:
+                self.create_index(sort)
+                order = sorted_positions(self.__postings[number], descending)
+            self.__orders[(number, descending)] = order
+        return order
+
+    def query(self, filters: Dict[str, str] = None, sort: str = None,
+              descending: bool = False) -> Sequence[int]:
+        """
+        Positions of the rows matching every filter, in sort order.
+
+        Without filters, this is the sort order of the column. Otherwise
+        the smallest posting list among the filtered columns is used as
+        the candidate set, and the other filters are checked on those
+        candidates only. The results of the last max_queries filtered
+        queries are kept, apart from the response cache.
+
+        Args:
+            filters (Dict[str, str]): Required value of some columns
+            sort (str): Column to sort by (default: None, dataset order)
+            descending (bool): Sort from largest to smallest
+
+        Returns:
+            Sequence[int]: The matching row positions
+        """
+        if not filters:
+            return self.sort_order(sort, descending)
+
+        key = (tuple(sorted(filters.items())), sort, descending)
+        positions = self.__queries.get(key)
+        if positions is not None:
+            self.__queries.move_to_end(key)
+            return positions
+
+        conditions = []
+        for column, value in filters.items():
+            self.create_index(column)
+            number = self.column_number(column)
+            # Rows missing the column match no filter
+            postings = self.__postings[number]
+            conditions.append((number, value, postings.get(value, ())
+                               if value is not None else ()))
+
+        dataset = self.dataset()
+        conditions.sort(key=lambda condition: len(condition[2]))
+        positions = array.array('I', (
+            position for position in conditions[0][2]
+            if all(field(dataset[position], number) == value
+                   for number, value, _ in conditions[1:])))
+
+        if sort is not None:
+            self.create_index(sort)
+            ranks = self.__ranks[self.column_number(sort)]
+            positions = array.array('I', sorted(
+                positions, key=ranks.__getitem__, reverse=descending))
+        elif descending:
+            positions.reverse()
+
+        self.__queries[key] = positions
+        if len(self.__queries) > self.max_queries:
+            self.__queries.popitem(last=False)
+        return positions
+
+    def get_filtered(self, filters: Dict[str, str] = None, sort: str = None,
+                     page: int = 1, page_size: int = 10,
+                     descending: bool = False) -> Dict:
+        """
+        Get hypermedia pagination information over the rows matching
+        filters, optionally sorted by a column.
+
+        Args:
+            filters (Dict[str, str]): Required value of some columns,
+                e.g. {'Gender': 'FEMALE'}
+            sort (str): Column to sort by (default: None, dataset order)
+            page (int): The page number (default: 1)
+            page_size (int): The number of items per page (default: 10)
+            descending (bool): Sort from largest to smallest
+
+        Returns:
+            Dict: Dictionary containing pagination metadata
+        """
+        assert isinstance(page, int) and page > 0
+        assert isinstance(page_size, int) and page_size > 0
+
+        positions = self.query(filters, sort, descending)
+        dataset = self.dataset()
+        start_index, end_index = index_range(page, page_size)
+        data = [dataset[position]
+                for position in positions[start_index:end_index]]
+        total_pages = math.ceil(len(positions) / page_size)
+
+        return {
+            'page_size': len(data),
+            'page': page,
+            'data': data,
+            'next_page': page + 1 if page < total_pages else None,
+            'prev_page': page - 1 if page > 1 else None,
+            'total_pages': total_pages
+        }
+
+
+if __name__ == "__main__":
+    server = Server()
+
+    print(server.get_filtered({'Year of Birth': '2016', 'Gender': 'FEMALE'},
+                              sort='Rank', page=1, page_size=3))
+    print("---")
+    print(server.get_filtered({'Ethnicity': 'HISPANIC'}, page=2,
+                              page_size=2))
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Keyset pagination with opaque, tamper-evident cursors
+"""
+
+import array
+import base64
+import collections
+import hashlib
+import hmac
+import json
+import secrets
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+filtered = __import__('11-filtered_pagination')
+sort_key = filtered.sort_key
+field = filtered.field
+LiveIndex = __import__('3-hypermedia_del_pagination').LiveIndex
+
+
+SIGNATURE_SIZE = 16
+
+
+def boundary(positions: Sequence[int], precedes: Callable[[int], bool]) -> int:
+    """
+    Binary search for the first position that does not precede a mark.
+
+    Args:
+        positions: Row positions in listing order
+        precedes: Predicate true for a prefix of positions only
+
+    Returns:
+        int: Index of the first position for which precedes is False
+    """
+    low, high = 0, len(positions)
+    while low < high:
+        middle = (low + high) // 2
+        if precedes(positions[middle]):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class Server(filtered.Server):
+    """Server class to paginate a database of popular baby names
+    with keyset cursors that stay stable under deletions.
+    """
+
+    def __init__(self, *args, secret: bytes = None, **kwargs):
+        """
+        Initialize the Server.
+
+        Args:
+            secret: Key signing the cursors (default: a random key, so
+                cursors are only valid for this Server instance)
+        """
+        super().__init__(*args, **kwargs)
+        if secret is None:
+            secret = secrets.token_bytes(32)
+        self.__secret = secret
+        self.__deleted = array.array('I')
+        self.__live_orders = collections.OrderedDict()
+
+    def encode_cursor(self, state: Dict[str, Any]) -> str:
+        """
+        Serialize and sign a cursor state.
+
+        Args:
+            state: The query and the sort key the cursor points at
+
+        Returns:
+            str: The URL-safe cursor
+        """
+        payload = json.dumps(state, separators=(',', ':')).encode('utf-8')
+        signature = hmac.new(self.__secret, payload,
+                             hashlib.sha256).digest()[:SIGNATURE_SIZE]
+        return "{}.{}".format(
+            base64.urlsafe_b64encode(payload).decode('ascii').rstrip('='),
+            base64.urlsafe_b64encode(signature).decode('ascii').rstrip('='))
+
+    def decode_cursor(self, cursor: str) -> Dict[str, Any]:
+        """
+        Check the signature of a cursor and deserialize it.
+
+        Args:
+            cursor: A cursor returned by get_cursor
+
+        Returns:
+            Dict[str, Any]: The cursor state
+
+        Raises:
+            ValueError: If the cursor is malformed or was tampered with
+        """
+        try:
+            payload, signature = (
+                base64.urlsafe_b64decode(part + '=' * (-len(part) % 4))
+                for part in cursor.split('.'))
+        except (ValueError, TypeError, AttributeError):
+            raise ValueError("malformed cursor")
+
+        expected = hmac.new(self.__secret, payload,
+                            hashlib.sha256).digest()[:SIGNATURE_SIZE]
+        if not hmac.compare_digest(signature, expected):
+            raise ValueError("invalid cursor signature")
+        return json.loads(payload.decode('utf-8'))
+
+    def get_cursor(self, cursor: str = None, page_size: int = 10,
+                   filters: Dict[str, str] = None, sort: str = None,
+                   descending: bool = False) -> Dict:
+        """
+        Get a page of rows following or preceding a cursor.
+
+        The cursor records the query and the sort key (column value and
+        row position) of the last row seen, so resuming is a binary search
+        over the sorted query result whatever the depth, and rows deleted
+        meanwhile never shift the following pages. Deleted rows are
+        skipped through a Fenwick tree of the query's live rows.
+
+        Args:
+            cursor (str): A next_cursor or prev_cursor from a previous
+                call, or None for the first page. When given, its own
+                filters, sort and direction are used.
+            page_size (int): The number of items per page (default: 10)
+            filters (Dict[str, str]): Required value of some columns
+            sort (str): Column to sort by (default: None, dataset order)
+            descending (bool): Sort from largest to smallest
+
+        Returns:
+            Dict: The page data, its size and the cursors around it
+        """
+        assert isinstance(page_size, int) and page_size > 0
+
+        state = None
+        if cursor is not None:
+            state = self.decode_cursor(cursor)
+            filters = dict(state['filters'])
+            sort = state['sort']
+            descending = state['descending']
+        filters = filters or {}
+
+        positions = self.query(filters, sort, descending)
+        dataset = self.dataset()
+        indexed_dataset = self.indexed_dataset()
+        column = None if sort is None else self.column_number(sort)
+
+        def mark(position: int, after: bool) -> str:
+            return self.encode_cursor({
+                'filters': sorted(filters.items()),
+                'sort': sort,
+                'descending': descending,
+                'value': None if column is None
+                else field(dataset[position], column),
+                'position': position,
+                'after': after,
+            })
+
+        live = self.__live_order(filters, sort, descending, positions)
+        found: List[int] = []
+        if state is None or state['after']:
+            start = 0
+            if state is not None:
+                start = boundary(positions, self.__precedes(state, True))
+            rank = live.rank(start)
+            while len(found) < page_size:
+                i = live.select(rank)
+                if i is None:
+                    break
+                # Rows dropped without delete() are only noticed here
+                if positions[i] in indexed_dataset:
+                    found.append(i)
+                    rank += 1
+                else:
+                    live.discard(i)
+        else:
+            stop = boundary(positions, self.__precedes(state, False))
+            rank = live.rank(stop) - 1
+            while len(found) < page_size and rank >= 0:
+                i = live.select(rank)
+                rank -= 1
+                if positions[i] in indexed_dataset:
+                    found.append(i)
+                else:
+                    live.discard(i)
+            found.reverse()
+
+        data = [indexed_dataset[positions[i]] for i in found]
+        next_cursor = prev_cursor = None
+        if found and found[-1] + 1 < len(positions):
+            next_cursor = mark(positions[found[-1]], True)
+        if found and found[0] > 0:
+            prev_cursor = mark(positions[found[0]], False)
+
+        return {
+            'page_size': len(data),
+            'data': data,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
+        }
+
+    def extend(self, rows: List[List]) -> None:
+        """
+        Append rows, dropping the live rows of every query
+        """
+        super().extend(rows)
+        self.__live_orders.clear()
+
+    def reset(self) -> None:
+        """Forget the loaded dataset, its indexes and deletions
+        """
+        super().reset()
+        self.__deleted = array.array('I')
+        self.__live_orders.clear()
+
+    def delete(self, index: int) -> bool:
+        """
+        Delete a row, recording it for the live rows of every query
+        """
+        deleted = super().delete(index)
+        if deleted:
+            self.__deleted.append(index)
+        return deleted
+
+    def delete_many(self, indexes: Iterable[int]) -> int:
+        """
+        Delete several rows, recording them for the live rows of every
+        query
+        """
+        indexes = list(indexes)
+        live = self.live_index()
+        self.__deleted.extend(index for index in indexes
+                              if isinstance(index, int) and index in live)
+        return super().delete_many(indexes)
+
+    def __live_order(self, filters: Dict[str, str], sort: str,
+                     descending: bool, positions: Sequence[int]) -> LiveIndex:
+        """
+        Fenwick tree of the rows of a query result that are still live,
+        by their index in the result.
+
+        It is built once per result, then brought up to date by locating
+        the rows deleted since with a binary search, or rebuilt when too
+        many were.
+        """
+        key = (tuple(sorted(filters.items())), sort, descending)
+        entry = self.__live_orders.get(key)
+        deleted = self.__deleted
+        if (entry is None or entry[0] is not positions
+                or len(deleted) - entry[2] > len(positions) // 16):
+            indexed_dataset = self.indexed_dataset()
+            live = LiveIndex(len(positions))
+            for i, position in enumerate(positions):
+                if position not in indexed_dataset:
+                    live.discard(i)
+            entry = [positions, live, len(deleted)]
+            self.__live_orders[key] = entry
+            if len(self.__live_orders) > self.max_queries:
+                self.__live_orders.popitem(last=False)
+        else:
+            self.__live_orders.move_to_end(key)
+
+        positions, live, seen = entry
+        if seen < len(deleted):
+            dataset = self.dataset()
+            column = None if sort is None else self.column_number(sort)
+            for position in deleted[seen:]:
+                i = boundary(positions, self.__precedes({
+                    'sort': sort,
+                    'descending': descending,
+                    'value': None if column is None
+                    else field(dataset[position], column),
+                    'position': position,
+                }, False))
+                if i < len(positions) and positions[i] == position:
+                    live.discard(i)
+            entry[2] = len(deleted)
+        return live
+
+    def __precedes(self, state: Dict[str, Any],
+                   inclusive: bool) -> Callable[[int], bool]:
+        """
+        Build the predicate telling whether a row comes before the row a
+        cursor state points at, in the listing order of its query.
+        """
+        dataset = self.dataset()
+        descending = state['descending']
+        mark_position = state['position']
+        if state['sort'] is None:
+            column = None
+            mark_value = mark_position
+        else:
+            column = self.column_number(state['sort'])
+            mark_value = sort_key(state['value'])
+
+        def precedes(position: int) -> bool:
+            if column is None:
+                value = position
+            else:
+                value = sort_key(field(dataset[position], column))
+            if value != mark_value:
+                return value > mark_value if descending else value < mark_value
+            return position <= mark_position if inclusive \
+                else position < mark_position
+
+        return precedes
+
+
+if __name__ == "__main__":
+    server = Server()
+
+    res = server.get_cursor(page_size=2, filters={'Gender': 'FEMALE'},
+                            sort='Rank')
+    print(res)
+    print("---")
+    following = server.get_cursor(res['next_cursor'], page_size=2)
+    print(following)
+    print("---")
+    print(server.get_cursor(following['prev_cursor'], page_size=2))
+
+    try:
+        server.get_cursor(res['next_cursor'][:-2] + 'AA')
+    except ValueError as error:
+        print(error)
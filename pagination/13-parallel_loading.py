@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Parallel, chunked loading of the pagination dataset
+"""
+
+import csv
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Tuple
+CursorServer = __import__('12-cursor_pagination').Server
+skip_record = __import__('4-mmap_pagination').skip_record
+
+
+CHUNK_SIZE = 4 * 1024 * 1024
+SENTINEL = "\uffffend of range\uffff"
+
+
+def split_records(data: mmap.mmap, chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Cut a CSV buffer into byte ranges of whole lines.
+
+    Cuts are only moved forward to the next line start, found with a
+    single search, so a quoted field spanning several lines may still be
+    split: load_parallel mends those from what the workers report.
+
+    Args:
+        data: The mapped contents of the CSV file
+        chunk_size: Approximate size of each range in bytes
+
+    Returns:
+        List[Tuple[int, int]]: The [start, stop) ranges of the data rows,
+        in file order, header excluded
+    """
+    size = len(data)
+    start = skip_record(data, 0)
+    if start == -1:
+        return []
+    ranges = []
+
+    while start < size:
+        newline = data.find(b'\n', start + chunk_size - 1)
+        stop = size if newline == -1 else newline + 1
+        ranges.append((start, stop))
+        start = stop
+
+    return ranges
+
+
+def parse_range(path: str, start: int, stop: int,
+                inside_quotes: bool = False) -> Tuple[List[List], bool]:
+    """
+    Parse the rows held in one byte range of a CSV file.
+
+    A sentinel line is parsed after the range: it comes back as a row of
+    its own unless the range ends inside a quoted field, in which case it
+    ends up in the last field instead, and is cut off again.
+
+    Args:
+        path: Path of the CSV file
+        start: Offset of a line start
+        stop: Offset just past a newline, or the size of the file
+        inside_quotes: Whether start lies inside a quoted field
+
+    Returns:
+        Tuple[List[List], bool]: The rows, the first of which only holds
+        the end of its first field if inside_quotes, and whether the last
+        row is cut short by the end of the range
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(stop - start).decode('utf-8')
+    if inside_quotes:
+        text = '"' + text
+    if not text.endswith('\n'):
+        # Only the end of the file lacks a newline: nothing follows it
+        return list(csv.reader(io.StringIO(text, newline=None))), False
+
+    rows = list(csv.reader(io.StringIO(text + SENTINEL + '\n',
+                                       newline=None)))
+    if rows[-1] == [SENTINEL]:
+        rows.pop()
+        return rows, False
+    rows[-1][-1] = rows[-1][-1][:-len(SENTINEL) - 1]
+    return rows, True
+
+
+def load_parallel(path: str, workers: int = None,
+                  chunk_size: int = CHUNK_SIZE) -> List[List]:
+    """
+    Parse a CSV file on several cores.
+
+    The rows are identical, and in the same order, as the ones the serial
+    csv.reader loader returns. Each range is parsed as if it started on a
+    record boundary. When the previous one turns out to end inside a
+    quoted field, the range is parsed again as the rest of that field and
+    the two halves of the row are joined, which only a field spanning a
+    cut requires.
+
+    Args:
+        path: Path of the CSV file
+        workers: Number of worker processes (default: one per core)
+        chunk_size: Approximate size of the range parsed by each task
+
+    Returns:
+        List[List]: The data rows, header excluded
+    """
+    if os.path.getsize(path) == 0:
+        return []
+
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            ranges = split_records(data, chunk_size)
+
+    if len(ranges) <= 1 or workers == 1:
+        return join_ranges(path, ranges, (parse_range(path, start, stop)
+                                          for start, stop in ranges))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        starts, stops = zip(*ranges)
+        return join_ranges(path, ranges, pool.map(
+            parse_range, [path] * len(ranges), starts, stops))
+
+
+def join_ranges(path: str, ranges: List[Tuple[int, int]],
+                parsed: Iterable[Tuple[List[List], bool]]) -> List[List]:
+    """
+    Concatenate the rows of consecutive ranges, parsing again, as the
+    continuation of a quoted field, every range that follows one ending
+    inside such a field.
+
+    Args:
+        path: Path of the CSV file
+        ranges: The [start, stop) ranges, in file order
+        parsed: What parse_range returned for each range, in order
+
+    Returns:
+        List[List]: The data rows
+    """
+    dataset: List[List] = []
+    pending = None
+    for (start, stop), (rows, ends_inside) in zip(ranges, parsed):
+        if pending is not None:
+            rows, ends_inside = parse_range(path, start, stop, True)
+            first = rows[0]
+            rows[0] = pending[:-1] + [pending[-1] + first[0]] + first[1:]
+            pending = None
+        if ends_inside:
+            pending = rows.pop()
+        dataset.extend(rows)
+    if pending is not None:
+        # A quoted field left open by the end of the file
+        dataset.append(pending)
+    return dataset
+
+
+class Server(CursorServer):
+    """Server class to paginate a database of popular baby names
+    parsed on several cores.
+    """
+
+    def __init__(self, *args, workers: int = None,
+                 chunk_size: int = CHUNK_SIZE, **kwargs):
+        """
+        Initialize the Server.
+
+        Args:
+            workers: Number of worker processes (default: one per core)
+            chunk_size: Approximate size of the range parsed by each task
+        """
+        super().__init__(*args, **kwargs)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.__parallel_dataset = None
+
+    def dataset(self) -> List[List]:
+        """Cached dataset
+        """
+        if self.__parallel_dataset is None:
+            self.__parallel_dataset = load_parallel(
+                self.DATA_FILE, self.workers, self.chunk_size)
+
+        return self.__parallel_dataset
+
+
+if __name__ == "__main__":
+    server = Server()
+
+    print(len(server.dataset()))
+    print(server.get_hyper(2, 2))
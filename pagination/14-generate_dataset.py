@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Generator of synthetic Popular_Baby_Names.csv-shaped datasets
+"""
+
+import argparse
+import csv
+import random
+from typing import List
+
+
+HEADER = ["Year of Birth", "Gender", "Ethnicity", "Child's First Name",
+          "Count", "Rank"]
+GENDERS = ["FEMALE", "MALE"]
+ETHNICITIES = ["ASIAN AND PACIFIC ISLANDER", "BLACK NON HISPANIC",
+               "HISPANIC", "WHITE NON HISPANIC"]
+YEARS = list(range(2011, 2020))
+SYLLABLES = ["a", "an", "bel", "da", "el", "ka", "la", "li", "ma", "mi",
+             "na", "no", "ra", "ri", "sa", "so", "ta", "vi", "ya", "zo"]
+SIZES = {'10k': 10000, '1m': 1000000, '10m': 10000000}
+
+
+def make_names(count: int, rng: random.Random) -> List[str]:
+    """
+    Build a pool of distinct, name-like strings.
+
+    Args:
+        count: Number of names
+        rng: Random number generator
+
+    Returns:
+        List[str]: The names, capitalized
+    """
+    names = set()
+    while len(names) < count:
+        length = rng.randint(2, 4)
+        names.add(''.join(rng.choice(SYLLABLES)
+                          for _ in range(length)).capitalize())
+    return sorted(names)
+
+
+def generate(path: str, rows: int, seed: int = 0,
+             distinct_names: int = 20000) -> None:
+    """
+    Write a CSV file with the header and value distribution of the real
+    baby-names dataset: few years, genders and ethnicities, a long tail
+    of first names, and counts decreasing as ranks grow.
+
+    Args:
+        path: Path of the file to write
+        rows: Number of data rows
+        seed: Seed of the random number generator (default: 0)
+        distinct_names: Size of the first-name pool (default: 20000)
+    """
+    rng = random.Random(seed)
+    names = make_names(distinct_names, rng)
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for _ in range(rows):
+            rank = min(int(rng.expovariate(1 / 30)) + 1, 102)
+            writer.writerow([
+                rng.choice(YEARS),
+                rng.choice(GENDERS),
+                rng.choice(ETHNICITIES),
+                names[min(int(rng.paretovariate(1.2)) - 1, len(names) - 1)
+                      if rng.random() < 0.5 else rng.randrange(len(names))],
+                max(10, int(300 / rank) + rng.randint(0, 10)),
+                rank,
+            ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('size', choices=sorted(SIZES),
+                        help="number of data rows")
+    parser.add_argument('--output', default=None,
+                        help="file to write (default: baby_names_<size>.csv)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    output = args.output or "baby_names_{}.csv".format(args.size)
+    generate(output, SIZES[args.size], args.seed)
+    print(output)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for every pagination mode
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import sys
+import time
+from typing import Dict, List
+summarize = __import__('22-latency_stats').summarize
+generate = __import__('14-generate_dataset').generate
+
+
+# Whole-file passes timed for iter_pages, whatever the number of calls
+STREAM_PASSES = 3
+
+# mode: (module, method loading the dataset, calls to time)
+MODES = {
+    'list': ('2-hypermedia_pagination', 'dataset',
+             ('get_page', 'get_hyper')),
+    'streaming': ('7-streaming_pagination', 'count_rows',
+                  ('iter_pages',)),
+    'mmap': ('4-mmap_pagination', 'row_index',
+             ('get_page', 'get_hyper')),
+    'columnar': ('5-columnar_pagination', 'dataset',
+                 ('get_page', 'get_hyper')),
+    'snapshot': ('6-snapshot_pagination', 'dataset',
+                 ('get_page', 'get_hyper')),
+    'deletion': ('3-hypermedia_del_pagination', 'live_index',
+                 ('get_hyper_index',)),
+    'cached': ('10-cached_pagination', 'preload',
+               ('get_page', 'get_hyper', 'get_hyper_index')),
+    'filtered': ('11-filtered_pagination', 'preload',
+                 ('get_filtered',)),
+    'cursor': ('12-cursor_pagination', 'preload',
+               ('get_cursor',)),
+    'parallel': ('13-parallel_loading', 'dataset',
+                 ('get_page', 'get_hyper')),
+}
+
+
+def time_calls(server, method: str, rows: int, calls: int, page_size: int,
+               rng: random.Random) -> Dict[str, float]:
+    """
+    Time calls of one pagination method on random pages.
+
+    get_filtered asks for the first page of the rows sharing the first two
+    columns of a random row, sorted by the last column, and iter_pages is
+    timed over the whole file, STREAM_PASSES times at most.
+    """
+    call = getattr(server, method)
+    pages = max(1, rows // page_size)
+    latencies = []
+    cursor = None
+    if method == 'iter_pages':
+        calls = min(calls, STREAM_PASSES)
+    if method == 'get_filtered':
+        header = server.header()
+        dataset = server.dataset()
+
+    for _ in range(calls):
+        if method == 'get_hyper_index':
+            args = (rng.randrange(max(1, rows)), page_size)
+        elif method == 'get_cursor':
+            args = (cursor, page_size)
+        elif method == 'get_filtered':
+            row = dataset[rng.randrange(rows)] if rows else []
+            args = (dict(zip(header[:2], row)), header[-1], 1, page_size)
+        elif method == 'iter_pages':
+            args = (page_size,)
+        else:
+            args = (rng.randint(1, pages), page_size)
+        started = time.perf_counter()
+        result = call(*args)
+        if method == 'iter_pages':
+            for _ in result:
+                pass
+        latencies.append(time.perf_counter() - started)
+        if method == 'get_cursor':
+            cursor = result['next_cursor']
+
+    return summarize(latencies)
+
+
+def run_mode(mode: str, path: str, calls: int, page_size: int,
+             delete_ratio: float, seed: int, results) -> None:
+    """
+    Benchmark one mode in a fresh process and report its measures.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    module, loader, methods = MODES[mode]
+    server = __import__(module).Server()
+    server.DATA_FILE = path
+    rng = random.Random(seed)
+
+    started = time.perf_counter()
+    getattr(server, loader)()
+    load_seconds = time.perf_counter() - started
+
+    if hasattr(server, 'row_count'):
+        rows = server.row_count()
+    elif hasattr(server, 'count_rows'):
+        # Streaming never holds the dataset in memory
+        rows = server.count_rows()
+    else:
+        rows = len(server.dataset())
+
+    result = {
+        'mode': mode,
+        'rows': rows,
+        'page_size': page_size,
+        'cold_load_s': round(load_seconds, 4),
+        'calls': {method: time_calls(server, method, rows, calls,
+                                     page_size, rng)
+                  for method in methods},
+    }
+
+    if hasattr(server, 'delete_many') and delete_ratio > 0:
+        deleted = rng.sample(range(rows), int(rows * delete_ratio))
+        started = time.perf_counter()
+        server.delete_many(deleted)
+        result['delete_s'] = round(time.perf_counter() - started, 4)
+        result['deleted'] = len(deleted)
+        result['calls_after_delete'] = {
+            method: time_calls(server, method, rows, calls, page_size, rng)
+            for method in methods
+            if method in ('get_hyper_index', 'get_cursor')}
+
+    # ru_maxrss is in kilobytes on Linux
+    result['peak_rss_mb'] = round(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    results.put(result)
+
+
+def wait_result(process, results, timeout: float = None) -> Dict:
+    """
+    Wait for the measure record of a run_mode process.
+
+    Args:
+        process: The started process
+        results: The queue it puts its record in
+        timeout: Maximum number of seconds to wait (default: forever)
+
+    Returns:
+        Dict: Its record, or an error record if it died or timed out
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        wait = 1.0
+        if deadline is not None:
+            wait = max(0.0, min(wait, deadline - time.monotonic()))
+        try:
+            return results.get(timeout=wait)
+        except queue.Empty:
+            pass
+        if not process.is_alive():
+            # The record may have been put just before the process ended
+            try:
+                return results.get(timeout=1.0)
+            except queue.Empty:
+                return {'error': "exited with code {}".format(
+                    process.exitcode)}
+        if deadline is not None and time.monotonic() >= deadline:
+            process.terminate()
+            return {'error': "timed out after {}s".format(timeout)}
+
+
+def benchmark(path: str, modes: List[str], calls: int = 1000,
+              page_size: int = 10, delete_ratio: float = 0.1,
+              seed: int = 0, timeout: float = None) -> List[Dict]:
+    """
+    Benchmark several modes against one dataset, each in its own process
+    so that load times and peak memory are not skewed by the others.
+    A run that crashes or times out gives a record with an 'error'.
+
+    Args:
+        path: Path of the CSV file
+        modes: Names of the modes to run, keys of MODES
+        calls: Number of timed calls per method (default: 1000)
+        page_size: Page size of every call (default: 10)
+        delete_ratio: Share of rows deleted before re-timing the
+            deletion-aware methods (default: 0.1)
+        seed: Seed of the random pages and deletions (default: 0)
+        timeout: Maximum number of seconds per run (default: forever)
+
+    Returns:
+        List[Dict]: One measure record per mode
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    records = []
+
+    for mode in modes:
+        runs = [mode]
+        if mode == 'snapshot':
+            # The first run parses the CSV and writes the snapshot
+            if os.path.exists(path + '.snap'):
+                os.remove(path + '.snap')
+            runs = ['snapshot', 'snapshot']
+        for i, run in enumerate(runs):
+            process = context.Process(target=run_mode, args=(
+                run, path, calls, page_size, delete_ratio, seed, results))
+            process.start()
+            record = wait_result(process, results, timeout)
+            process.join()
+            record.setdefault('mode', run)
+            if len(runs) > 1:
+                record['mode'] = ('snapshot_build', 'snapshot')[i]
+            record['dataset'] = os.path.basename(path)
+            records.append(record)
+
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000],
+                        help="synthetic dataset sizes, e.g. 10000 1000000")
+    parser.add_argument('--modes', nargs='+', default=list(MODES),
+                        choices=list(MODES))
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--delete-ratio', type=float, default=0.1)
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="seconds after which a run is stopped")
+    parser.add_argument('--data-dir', default='.',
+                        help="where synthetic datasets are generated")
+    parser.add_argument('--output', default=None,
+                        help="JSON lines file (default: standard output)")
+    args = parser.parse_args()
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for rows in args.rows:
+            path = os.path.join(args.data_dir,
+                                "baby_names_{}.csv".format(rows))
+            if not os.path.exists(path):
+                generate(path, rows)
+            for record in benchmark(path, args.modes, args.calls,
+                                    args.page_size, args.delete_ratio,
+                                    timeout=args.timeout):
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
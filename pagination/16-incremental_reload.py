@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Pagination over an append-only CSV file, reloaded incrementally
+"""
+
+import csv
+import functools
+import io
+import os
+import time
+from typing import Callable, List, Tuple
+CursorServer = __import__('12-cursor_pagination').Server
+skip_record = __import__('4-mmap_pagination').skip_record
+
+
+def complete_length(chunk: bytes) -> int:
+    """
+    Length of the longest prefix of chunk made of whole records.
+
+    A record is whole once the newline ending it is written, and a newline
+    only ends a record when it lies outside quoted fields. Runs of lines
+    without quotes are skipped with a single search.
+
+    Args:
+        chunk: Bytes starting on a record boundary
+
+    Returns:
+        int: Number of bytes up to the end of the last whole record
+    """
+    end = 0
+    while True:
+        # Lines without quotes each hold a whole record
+        quote = chunk.find(b'"', end)
+        if quote == -1:
+            return chunk.rfind(b'\n', end) + 1 or end
+        end = chunk.rfind(b'\n', end, quote) + 1 or end
+        record_end = skip_record(chunk, end)
+        if record_end == -1:
+            return end
+        end = record_end
+
+
+def read_records(path: str, offset: int,
+                 final: bool = False) -> Tuple[List[List], int, int, int]:
+    """
+    Parse the whole records written to a file from offset onwards.
+
+    Args:
+        path: Path of the CSV file
+        offset: Byte offset of a record boundary
+        final: Also parse a last record whose newline is not written, as
+            csv.reader does, making it the last row
+
+    Returns:
+        Tuple[List[List], int, int, int]: The rows, the offset just past
+        the last whole record, the offset just past the bytes read and the
+        inode of the file read
+    """
+    with open(path, 'rb') as f:
+        inode = os.fstat(f.fileno()).st_ino
+        f.seek(offset)
+        chunk = f.read()
+
+    end = complete_length(chunk)
+    text = (chunk if final else chunk[:end]).decode('utf-8')
+    rows = list(csv.reader(io.StringIO(text, newline=None)))
+    return rows, offset + end, offset + len(chunk), inode
+
+
+def refreshing(method: Callable) -> Callable:
+    """
+    Make a Server method pick up appended rows before answering, even when
+    its response would otherwise come from the cache.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.dataset()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+class Server(CursorServer):
+    """Server class to paginate a database of popular baby names
+    that grows while the Server runs.
+
+    Rows appended to DATA_FILE are parsed on their own and added to the
+    dataset and every index in place. A final record without its newline
+    is part of the first load, as with csv.reader, but later ones are only
+    picked up once the newline ending them has been written. If the file
+    shrinks or is replaced, or the final record of the first load turns
+    out to go on, everything is loaded again.
+    """
+
+    def __init__(self, *args, refresh_interval: float = 1.0, **kwargs):
+        """
+        Initialize the Server.
+
+        Args:
+            refresh_interval: Minimum number of seconds between two checks
+                of the file size, 0 to check on every call
+        """
+        super().__init__(*args, **kwargs)
+        self.refresh_interval = refresh_interval
+        self.__rows = None
+        self.__end = 0
+        self.__size = 0
+        self.__tail = None
+        self.__inode = None
+        self.__checked = 0.0
+        self.__refreshing = False
+
+    def dataset(self) -> List[List]:
+        """Cached dataset, checked for appended rows now and then, but
+        not while a refresh is adding rows to it
+        """
+        if self.__rows is None:
+            self.__checked = time.monotonic()
+            rows, self.__end, self.__size, self.__inode = read_records(
+                self.DATA_FILE, 0, final=True)
+            # Kept to tell whether appended bytes merely end this record
+            self.__tail = rows[-1] if self.__size > self.__end else None
+            self.__rows = rows[1:]
+        elif (not self.__refreshing
+              and time.monotonic() - self.__checked >= self.refresh_interval):
+            self.refresh()
+
+        return self.__rows
+
+    def refresh(self) -> int:
+        """
+        Load the rows appended to DATA_FILE since the last check.
+
+        The indexes call dataset() while the rows are added, which must
+        not start a second refresh that would append later rows first.
+
+        Returns:
+            int: Number of new rows
+        """
+        if self.__refreshing:
+            return 0
+        self.__checked = time.monotonic()
+        if self.__rows is None:
+            return len(self.dataset())
+
+        stat = os.stat(self.DATA_FILE)
+        if stat.st_ino != self.__inode or stat.st_size < self.__size:
+            self.reset()
+            return len(self.dataset())
+        if stat.st_size == self.__size:
+            return 0
+
+        rows, end, self.__size, _ = read_records(self.DATA_FILE, self.__end)
+        if self.__tail is not None:
+            if not rows or rows[0] != self.__tail:
+                self.reset()
+                return len(self.dataset())
+            rows = rows[1:]
+            self.__tail = None
+        self.__end = end
+        if rows:
+            self.__refreshing = True
+            try:
+                self.extend(rows)
+            finally:
+                self.__refreshing = False
+        return len(rows)
+
+    def reset(self) -> None:
+        """Forget the loaded dataset and every index built on it
+        """
+        super().reset()
+        self.__rows = None
+        self.__end = 0
+        self.__size = 0
+        self.__tail = None
+
+    get_page = refreshing(CursorServer.get_page)
+    get_hyper = refreshing(CursorServer.get_hyper)
+    get_hyper_index = refreshing(CursorServer.get_hyper_index)
+    get_filtered = refreshing(CursorServer.get_filtered)
+    get_cursor = refreshing(CursorServer.get_cursor)
+
+
+if __name__ == "__main__":
+    server = Server(refresh_interval=0)
+
+    print(server.get_hyper(1, 2))
+    print("New rows: {}".format(server.refresh()))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Thread-safe pagination with lock-free reads over versioned snapshots
+"""
+
+import random
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping
+deletion = __import__('3-hypermedia_del_pagination')
+BaseServer = __import__('23-combined_pagination').Server
+LiveIndex = deletion.LiveIndex
+hyper_index = deletion.hyper_index
+
+
+class Version:
+    """Immutable state of the dataset at one point in time.
+
+    A Version is never changed once published: writers build a new one
+    and swap it in, so readers holding the old one are never disturbed.
+    """
+
+    __slots__ = ('number', 'dataset', 'indexed_dataset', 'live')
+
+    def __init__(self, number: int, dataset: List[List],
+                 indexed_dataset: Dict[int, List], live: LiveIndex):
+        self.number = number
+        self.dataset = dataset
+        self.indexed_dataset = indexed_dataset
+        self.live = live
+
+
+class Server(BaseServer):
+    """Server class to paginate a database of popular baby names
+    safely from many threads.
+
+    The dataset is loaded once under a lock, however many threads ask for
+    it first. Readers then take the current Version with a single
+    attribute read and never lock. Deletions and appends copy the indexes,
+    change the copy and publish it as a new Version under the lock, so
+    batch them with delete_many.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.__lock = threading.Lock()
+        self.__version = None
+
+    def version(self) -> Version:
+        """Current Version, loading the dataset on first use
+        """
+        version = self.__version
+        if version is None:
+            with self.__lock:
+                version = self.__version
+                if version is None:
+                    dataset = super().dataset()
+                    version = Version(0, dataset, dict(enumerate(dataset)),
+                                      LiveIndex(len(dataset)))
+                    self.__version = version
+        return version
+
+    def dataset(self) -> List[List]:
+        """Dataset of the current Version
+        """
+        return self.version().dataset
+
+    def indexed_dataset(self) -> Mapping[int, List]:
+        """Live rows of the current Version, by original position, as a
+        read-only view: rows are only deleted through delete_many
+        """
+        return MappingProxyType(self.version().indexed_dataset)
+
+    def live_index(self) -> LiveIndex:
+        """Index of the live rows of the current Version
+        """
+        return self.version().live
+
+    def get_hyper_index(self, index: int = None, page_size: int = 10) -> Dict:
+        """
+        Get deletion-resilient hypermedia pagination information from one
+        consistent Version, without locking
+        """
+        version = self.version()
+        return hyper_index(version.indexed_dataset, version.live,
+                           index, page_size)
+
+    def delete(self, index: int) -> bool:
+        """
+        Delete a row by its position in the original dataset
+        """
+        return self.delete_many((index,)) == 1
+
+    def delete_many(self, indexes: Iterable[int]) -> int:
+        """
+        Delete several rows at once, publishing a single new Version.
+
+        Args:
+            indexes (Iterable[int]): Positions of the rows to delete
+
+        Returns:
+            int: Number of rows actually deleted
+        """
+        indexes = list(indexes)
+        assert all(isinstance(index, int) and index >= 0
+                   for index in indexes)
+
+        self.version()
+        with self.__lock:
+            current = self.__version
+            doomed = [index for index in indexes
+                      if index in current.indexed_dataset]
+            if not doomed:
+                return 0
+
+            indexed_dataset = dict(current.indexed_dataset)
+            live = current.live.copy()
+            count = 0
+            for index in doomed:
+                if indexed_dataset.pop(index, None) is not None:
+                    live.discard(index)
+                    count += 1
+            self.__version = Version(current.number + 1, current.dataset,
+                                     indexed_dataset, live)
+        return count
+
+    def extend(self, rows: List[List]) -> None:
+        """
+        Append rows, publishing a new Version
+        """
+        self.version()
+        with self.__lock:
+            current = self.__version
+            start = len(current.dataset)
+            indexed_dataset = dict(current.indexed_dataset)
+            indexed_dataset.update(enumerate(rows, start))
+            live = current.live.copy()
+            live.extend(len(rows))
+            self.__version = Version(current.number + 1,
+                                     current.dataset + rows,
+                                     indexed_dataset, live)
+
+    def reset(self) -> None:
+        """Forget the loaded dataset, so that it is loaded again
+        """
+        with self.__lock:
+            super().reset()
+            self.__version = None
+
+
+def stress(server: Server, readers: int = 8, deleters: int = 2,
+           seconds: float = 2.0, page_size: int = 10) -> Dict[str, int]:
+    """
+    Hammer a Server from many threads and check every answer.
+
+    All threads first race to load the dataset, which must happen once.
+    Readers then page from random indexes while deleters remove random
+    rows. Each page must hold rows in strictly increasing original
+    position from index on, be full unless it is the last one, and point
+    next_index past its last row. Finally the indexes must agree with the
+    number of rows reported deleted.
+
+    Args:
+        server: A Server that has not loaded its dataset yet
+        readers: Number of reading threads
+        deleters: Number of deleting threads
+        seconds: How long the threads run
+        page_size: Page size of every read
+
+    Returns:
+        Dict[str, int]: Number of reads, deletions and loads observed
+
+    Raises:
+        AssertionError: If any invariant is broken
+    """
+    barrier = threading.Barrier(readers + deleters)
+    deadline = time.monotonic() + seconds
+    datasets = []
+    errors = []
+    reads = []
+    deletions = []
+
+    def read(seed: int) -> None:
+        rng = random.Random(seed)
+        barrier.wait()
+        datasets.append(server.dataset())
+        positions = {id(row): i for i, row in enumerate(server.dataset())}
+        count = 0
+        while time.monotonic() < deadline:
+            index = rng.randrange(len(positions))
+            res = server.get_hyper_index(index, page_size)
+            found = [positions[id(row)] for row in res['data']]
+            if (found != sorted(set(found)) or (found and found[0] < index)
+                    or (res['next_index'] is not None
+                        and (len(found) != page_size
+                             or res['next_index'] <= found[-1]))):
+                errors.append(res)
+            count += 1
+        reads.append(count)
+
+    def delete(seed: int) -> None:
+        rng = random.Random(seed)
+        barrier.wait()
+        size = len(server.dataset())
+        count = 0
+        while time.monotonic() < deadline:
+            count += server.delete_many(
+                rng.randrange(size) for _ in range(rng.randint(1, 50)))
+        deletions.append(count)
+
+    threads = [threading.Thread(target=read, args=(i,))
+               for i in range(readers)]
+    threads += [threading.Thread(target=delete, args=(readers + i,))
+                for i in range(deleters)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    loads = len({id(dataset) for dataset in datasets})
+    version = server.version()
+    assert loads == 1, "dataset loaded {} times".format(loads)
+    assert not errors, "inconsistent page: {}".format(errors[0])
+    assert len(version.indexed_dataset) == version.live.count
+    assert len(version.dataset) - sum(deletions) == version.live.count
+
+    return {'reads': sum(reads), 'deleted': sum(deletions), 'loads': loads,
+            'version': version.number}
+
+
+if __name__ == "__main__":
+    print(stress(Server()))
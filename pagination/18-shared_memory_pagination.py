@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Pagination served by many processes from one shared-memory dataset
+"""
+
+import array
+import json
+import multiprocessing
+import struct
+from multiprocessing import shared_memory
+from typing import List, Tuple
+columnar = __import__('5-columnar_pagination')
+ColumnStore = columnar.ColumnStore
+load_columns = columnar.load_columns
+
+
+PREAMBLE = struct.Struct("<Q")
+ALIGNMENT = 8
+
+
+class SharedStrings:
+    """Read-only sequence of str stored as one UTF-8 blob plus the offset
+    of each string in it.
+    """
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+
+def pack(store: ColumnStore) -> Tuple[dict, List[bytes]]:
+    """
+    Lay out a ColumnStore as a list of aligned binary parts.
+
+    Args:
+        store: The columns to lay out
+
+    Returns:
+        Tuple[dict, List[bytes]]: Metadata giving the offset of every
+        column and dictionary, and the parts in the same order
+    """
+    meta = {'rows': len(store), 'header': store.header,
+            'columns': [], 'dictionaries': [],
+            'ragged': sorted(store.ragged.items())}
+    parts = []
+    offset = 0
+
+    def add(data: bytes) -> int:
+        nonlocal offset
+        start = offset
+        parts.append(data + b'\0' * (-len(data) % ALIGNMENT))
+        offset += len(parts[-1])
+        return start
+
+    for column, values in zip(store.columns, store.dictionaries):
+        column = array.array(column.typecode, column)
+        meta['columns'].append({'typecode': column.typecode,
+                                'offset': add(column.tobytes())})
+        if values is None:
+            meta['dictionaries'].append(None)
+            continue
+        encoded = [value.encode('utf-8') for value in values]
+        offsets = array.array('Q', [0])
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        meta['dictionaries'].append({'count': len(encoded),
+                                     'offsets': add(offsets.tobytes()),
+                                     'blob': add(b''.join(encoded)),
+                                     'size': offsets[-1]})
+
+    return meta, parts
+
+
+def share_dataset(path: str, name: str = None) -> shared_memory.SharedMemory:
+    """
+    Parse a CSV file and publish its columns in a shared memory block.
+
+    The caller owns the block: it must keep it open while workers use it
+    and unlink it once they are done.
+
+    Args:
+        path: Path of the CSV file
+        name: Name of the block (default: a random name)
+
+    Returns:
+        shared_memory.SharedMemory: The block, whose name workers attach to
+    """
+    meta, parts = pack(load_columns(path))
+    blob = json.dumps(meta).encode('utf-8')
+    blob += b' ' * (-(PREAMBLE.size + len(blob)) % ALIGNMENT)
+    start = PREAMBLE.size + len(blob)
+
+    memory = shared_memory.SharedMemory(
+        name=name, create=True,
+        size=max(1, start + sum(len(part) for part in parts)))
+    PREAMBLE.pack_into(memory.buf, 0, len(blob))
+    memory.buf[PREAMBLE.size:start] = blob
+    for part in parts:
+        memory.buf[start:start + len(part)] = part
+        start += len(part)
+    return memory
+
+
+def attach(name: str) -> Tuple[ColumnStore, shared_memory.SharedMemory]:
+    """
+    Attach to a published block and map its columns without copying them.
+
+    Python 3.13 and later are told not to track the block, so that a
+    worker exiting never unlinks a block its parent still serves. Older
+    versions always track it, which is harmless for workers forked or
+    spawned by the owner of the block, since they share its tracker.
+
+    Args:
+        name: Name of the shared memory block
+
+    Returns:
+        Tuple[ColumnStore, shared_memory.SharedMemory]: Read-only columns
+        backed by the block, and the block itself, which must stay
+        referenced as long as the columns are used
+    """
+    try:
+        memory = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        memory = shared_memory.SharedMemory(name=name)
+
+    view = memory.buf.toreadonly()
+    length, = PREAMBLE.unpack_from(view)
+    start = PREAMBLE.size + length
+    meta = json.loads(bytes(view[PREAMBLE.size:start]).decode('utf-8'))
+    rows = meta['rows']
+
+    def part(offset: int, size: int) -> memoryview:
+        return view[start + offset:start + offset + size]
+
+    columns = []
+    for column in meta['columns']:
+        itemsize = array.array(column['typecode']).itemsize
+        columns.append(part(column['offset'], rows * itemsize)
+                       .cast(column['typecode']))
+
+    dictionaries = []
+    for values in meta['dictionaries']:
+        if values is None:
+            dictionaries.append(None)
+            continue
+        offsets = part(values['offsets'], 8 * (values['count'] + 1))
+        dictionaries.append(SharedStrings(offsets.cast('Q'),
+                                          part(values['blob'],
+                                               values['size'])))
+
+    ragged = {index: row for index, row in meta['ragged']}
+    return ColumnStore(meta['header'], columns, dictionaries, ragged), memory
+
+
+class Server(columnar.Server):
+    """Server class to paginate a database of popular baby names
+    from a dataset shared by every worker process.
+    """
+
+    def __init__(self, shared_name: str = None):
+        """
+        Initialize the Server.
+
+        Args:
+            shared_name: Name of a block published with share_dataset
+                (default: None, load a private copy of DATA_FILE)
+        """
+        super().__init__()
+        self.shared_name = shared_name
+        self.__shared = None
+        self.__memory = None
+
+    def dataset(self) -> ColumnStore:
+        """Cached dataset, attached to the shared block if there is one
+        """
+        if self.shared_name is None:
+            return super().dataset()
+        if self.__shared is None:
+            self.__shared, self.__memory = attach(self.shared_name)
+
+        return self.__shared
+
+    def close(self) -> None:
+        """Detach from the shared block
+        """
+        self.__shared = None
+        if self.__memory is not None:
+            self.__memory.close()
+            self.__memory = None
+
+
+def worker(name: str, page: int) -> None:
+    """
+    Serve one page from the shared block, as a pre-forked worker would.
+    """
+    server = Server(shared_name=name)
+    print(server.get_hyper(page, 2))
+
+
+if __name__ == "__main__":
+    memory = share_dataset(Server.DATA_FILE)
+    try:
+        workers = [multiprocessing.Process(target=worker,
+                                           args=(memory.name, page))
+                   for page in range(1, 5)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+    finally:
+        memory.close()
+        memory.unlink()
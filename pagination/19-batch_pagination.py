@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Batched retrieval of many pages in one pass over the dataset
+"""
+
+import math
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Sequence, Tuple
+index_range = __import__('0-simple_helper_function').index_range
+BaseServer = __import__('23-combined_pagination').Server
+
+
+def merge_ranges(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Merge overlapping or touching [start, stop) ranges.
+
+    Args:
+        ranges: The ranges, in any order
+
+    Returns:
+        List[Tuple[int, int]]: Disjoint ranges covering the same items,
+        sorted by start
+    """
+    merged: List[List[int]] = []
+    for start, stop in sorted(ranges):
+        if start >= stop:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return [(start, stop) for start, stop in merged]
+
+
+class Covering:
+    """Items of several disjoint ranges, fetched once and sliced on demand.
+    """
+
+    def __init__(self, ranges: List[Tuple[int, int]], fetch):
+        """
+        Fetch every range once.
+
+        Args:
+            ranges: Disjoint ranges sorted by start, as merge_ranges returns
+            fetch: Callable returning the list of items in [start, stop)
+        """
+        self.starts = [start for start, _ in ranges]
+        self.chunks = [fetch(start, stop) for start, stop in ranges]
+
+    def slice(self, start: int, stop: int) -> List:
+        """
+        Items in [start, stop), which must lie within one fetched range.
+        """
+        i = bisect_right(self.starts, start) - 1
+        if i < 0 or start >= stop:
+            return []
+        offset = self.starts[i]
+        return self.chunks[i][start - offset:stop - offset]
+
+
+class Server(BaseServer):
+    """Server class to paginate a database of popular baby names,
+    answering many page requests at once.
+    """
+
+    def get_pages_batch(self, requests: Sequence[Dict]) -> List[Dict]:
+        """
+        Answer many page requests in one call.
+
+        Overlapping requests are coalesced: the dataset is sliced once per
+        merged range of rows, and the live index is walked once per merged
+        range of ranks, then every response is cut from those.
+
+        Args:
+            requests (Sequence[Dict]): Each either {'page': int,
+                'page_size': int}, answered like get_hyper, or
+                {'index': int, 'page_size': int}, answered like
+                get_hyper_index. Missing keys take the usual defaults.
+
+        Returns:
+            List[Dict]: The responses, in request order
+        """
+        results: List[Dict] = [{} for _ in requests]
+        pages = []
+        indexes = []
+        for i, request in enumerate(requests):
+            page_size = request.get('page_size', 10)
+            assert isinstance(page_size, int) and page_size > 0
+            if 'index' in request:
+                index = request['index']
+                indexes.append((i, 0 if index is None else index, page_size))
+            else:
+                page = request.get('page', 1)
+                assert isinstance(page, int) and page > 0
+                pages.append((i, page, page_size))
+
+        if pages:
+            self.__pages_batch(pages, results)
+        if indexes:
+            self.__indexes_batch(indexes, results)
+        return results
+
+    def __pages_batch(self, pages: List[Tuple[int, int, int]],
+                      results: List[Dict]) -> None:
+        """
+        Fill in the responses of page requests.
+        """
+        dataset = self.dataset()
+        total_items = len(dataset)
+        spans = {}
+        for i, page, page_size in pages:
+            start, stop = index_range(page, page_size)
+            spans[i] = (min(start, total_items), min(stop, total_items))
+
+        rows = Covering(merge_ranges(spans.values()),
+                        lambda start, stop: dataset[start:stop])
+        for i, page, page_size in pages:
+            data = rows.slice(*spans[i])
+            total_pages = math.ceil(total_items / page_size)
+            results[i].update({
+                'page_size': len(data),
+                'page': page,
+                'data': data,
+                'next_page': page + 1 if page < total_pages else None,
+                'prev_page': page - 1 if page > 1 else None,
+                'total_pages': total_pages
+            })
+
+    def __indexes_batch(self, indexes: List[Tuple[int, int, int]],
+                        results: List[Dict]) -> None:
+        """
+        Fill in the responses of deletion-resilient index requests.
+        """
+        indexed_dataset = self.indexed_dataset()
+        live = self.live_index()
+        total_items = len(live)
+        for _, index, _ in indexes:
+            assert isinstance(index, int) and 0 <= index < total_items
+
+        while True:
+            spans = {}
+            for i, index, page_size in indexes:
+                rank = live.rank(index)
+                spans[i] = (rank, min(rank + page_size, live.count))
+            positions = Covering(
+                merge_ranges(spans.values()),
+                lambda start, stop: [live.select(rank)
+                                     for rank in range(start, stop)])
+            # Rows removed straight from the mapping: forget them and retry
+            missing = [position for chunk in positions.chunks
+                       for position in chunk
+                       if position not in indexed_dataset]
+            if not missing:
+                break
+            for position in missing:
+                live.discard(position)
+
+        for i, index, page_size in indexes:
+            found = positions.slice(*spans[i])
+            next_index = None
+            if len(found) == page_size and found[-1] + 1 < total_items:
+                next_index = found[-1] + 1
+            results[i].update({
+                'index': index,
+                'next_index': next_index,
+                'page_size': page_size,
+                'data': [indexed_dataset[position] for position in found]
+            })
+
+
+if __name__ == "__main__":
+    server = Server()
+
+    for res in server.get_pages_batch([
+            {'page': 1, 'page_size': 2},
+            {'index': 3, 'page_size': 2},
+            {'page': 2, 'page_size': 1},
+            {'page': 3000, 'page_size': 100},
+    ]):
+        print(res)
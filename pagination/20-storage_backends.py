@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Pagination over pluggable storage backends: in-memory CSV and SQLite
+
+Only the Server of this module reads from a Storage; the other modules
+keep their own in-memory datasets.
+"""
+
+import csv
+import json
+import math
+import os
+import random
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Tuple
+index_range = __import__('0-simple_helper_function').index_range
+LiveIndex = __import__('3-hypermedia_del_pagination').LiveIndex
+summarize = __import__('22-latency_stats').summarize
+
+
+SQLITE_SUFFIX = ".sqlite3"
+# Bumped whenever the layout of the rows table changes
+SQLITE_FORMAT = 2
+BATCH_SIZE = 10000
+
+
+class Storage(ABC):
+    """Interface of the row stores a Server paginates.
+
+    Rows are addressed by their position in the CSV file, and returned
+    as csv.reader parsed them, blank and ragged ones included. Deleted
+    rows keep their position, and only the live-row methods skip them.
+    """
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of row positions, deleted rows included
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def rows(self, start: int, stop: int) -> List[List]:
+        """Rows in positions [start, stop), deleted rows included
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def live_after(self, index: int, limit: int) -> List[Tuple[int, List]]:
+        """Position and row of the first limit live rows from index on
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, positions: Iterable[int]) -> int:
+        """Delete rows, returning how many were live
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release the resources held by the store
+        """
+
+
+class CSVStorage(Storage):
+    """Rows parsed from the CSV file and kept in memory, with a Fenwick
+    tree of the live ones.
+    """
+
+    def __init__(self, path: str):
+        with open(path) as f:
+            reader = csv.reader(f)
+            dataset = [row for row in reader]
+        self.__dataset = dataset[1:]
+        self.__live = LiveIndex(len(self.__dataset))
+
+    def count(self) -> int:
+        return len(self.__dataset)
+
+    def rows(self, start: int, stop: int) -> List[List]:
+        return self.__dataset[start:stop]
+
+    def live_after(self, index: int, limit: int) -> List[Tuple[int, List]]:
+        found = []
+        rank = self.__live.rank(index)
+        for rank in range(rank, min(rank + limit, self.__live.count)):
+            position = self.__live.select(rank)
+            found.append((position, self.__dataset[position]))
+        return found
+
+    def delete(self, positions: Iterable[int]) -> int:
+        return sum(self.__live.discard(position) for position in positions)
+
+
+class SQLiteStorage(Storage):
+    """Rows kept on disk in a SQLite table keyed by position.
+
+    The table is built from the CSV file on first use, and rebuilt when
+    the file's size or modification time changes. Rows whose number of
+    fields differs from the header's are kept whole, as JSON, in an extra
+    column. Pages are read with range and keyset queries on the primary
+    key, never with OFFSET, so datasets larger than memory page in
+    constant time. Deletions are kept in a temporary table, so that like
+    every other Server they only last as long as the connection.
+    """
+
+    def __init__(self, path: str, db_path: str = None):
+        """
+        Open, and build if needed, the SQLite copy of a CSV file.
+
+        Args:
+            path: Path of the CSV file
+            db_path: Path of the database (default: path + '.sqlite3')
+        """
+        self.path = path
+        self.db_path = db_path or path + SQLITE_SUFFIX
+        self.__db = sqlite3.connect(self.db_path)
+        self.__db.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+
+        stat = os.stat(path)
+        key = json.dumps([stat.st_size, stat.st_mtime_ns, SQLITE_FORMAT])
+        built = self.__db.execute(
+            "SELECT value FROM meta WHERE key = 'source'").fetchone()
+        if built is None or built[0] != key:
+            self.__build(key)
+
+        width, = self.__db.execute(
+            "SELECT value FROM meta WHERE key = 'width'").fetchone()
+        self.__columns = "".join("c{}, ".format(i) for i in range(width))
+        self.__count, = self.__db.execute(
+            "SELECT COUNT(*) FROM rows").fetchone()
+        self.__db.execute(
+            "CREATE TEMP TABLE deleted (position INTEGER PRIMARY KEY)")
+
+    def __build(self, key: str) -> None:
+        """
+        Load the CSV file into the rows table, one batch at a time.
+        """
+        with open(self.path) as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            width = len(header)
+            columns = "".join(", c{} TEXT".format(i) for i in range(width))
+            insert = "INSERT INTO rows VALUES ({})".format(
+                ", ".join("?" * (width + 2)))
+
+            with self.__db as db:
+                db.execute("DROP TABLE IF EXISTS rows")
+                db.execute("CREATE TABLE rows (position INTEGER PRIMARY KEY"
+                           "{}, ragged TEXT)".format(columns))
+                batch = []
+                for position, row in enumerate(reader):
+                    if len(row) == width:
+                        batch.append([position] + row + [None])
+                    else:
+                        batch.append([position] + [None] * width
+                                     + [json.dumps(row)])
+                    if len(batch) == BATCH_SIZE:
+                        db.executemany(insert, batch)
+                        batch = []
+                db.executemany(insert, batch)
+                db.executemany("REPLACE INTO meta VALUES (?, ?)", [
+                    ('source', key), ('width', width),
+                    ('header', json.dumps(header))])
+
+    def count(self) -> int:
+        return self.__count
+
+    @staticmethod
+    def __row(values: Tuple) -> List:
+        """
+        Row of the selected columns, the last of which is ragged.
+        """
+        if values[-1] is not None:
+            return json.loads(values[-1])
+        return list(values[:-1])
+
+    def rows(self, start: int, stop: int) -> List[List]:
+        cursor = self.__db.execute(
+            "SELECT {}ragged FROM rows WHERE position >= ? AND position < ? "
+            "ORDER BY position".format(self.__columns), (start, stop))
+        return [self.__row(row) for row in cursor]
+
+    def live_after(self, index: int, limit: int) -> List[Tuple[int, List]]:
+        cursor = self.__db.execute(
+            "SELECT position, {}ragged FROM rows WHERE position >= ? "
+            "AND position NOT IN (SELECT position FROM deleted) "
+            "ORDER BY position LIMIT ?".format(self.__columns),
+            (index, limit))
+        return [(row[0], self.__row(row[1:])) for row in cursor]
+
+    def delete(self, positions: Iterable[int]) -> int:
+        with self.__db as db:
+            cursor = db.executemany(
+                "INSERT OR IGNORE INTO deleted "
+                "SELECT position FROM rows WHERE position = ?",
+                ((position,) for position in positions))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self.__db.close()
+
+
+class Server:
+    """Server class to paginate a database of popular baby names
+    held by any Storage backend.
+    """
+    DATA_FILE = "Popular_Baby_Names.csv"
+
+    def __init__(self, storage: Storage = None):
+        """
+        Initialize the Server.
+
+        Args:
+            storage: The backend (default: a CSVStorage of DATA_FILE,
+                created on first use)
+        """
+        self.__storage = storage
+
+    def storage(self) -> Storage:
+        """Cached storage backend
+        """
+        if self.__storage is None:
+            self.__storage = CSVStorage(self.DATA_FILE)
+        return self.__storage
+
+    def get_page(self, page: int = 1, page_size: int = 10) -> List[List]:
+        """
+        Get a page from the dataset
+
+        Args:
+            page (int): The page number (default: 1)
+            page_size (int): The number of items per page (default: 10)
+
+        Returns:
+            List[List]: The requested page of data
+        """
+        assert isinstance(page, int) and page > 0
+        assert isinstance(page_size, int) and page_size > 0
+
+        start_index, end_index = index_range(page, page_size)
+        if start_index >= self.storage().count():
+            return []
+        return self.storage().rows(start_index, end_index)
+
+    def get_hyper(self, page: int = 1, page_size: int = 10) -> Dict:
+        """
+        Get hypermedia pagination information
+
+        Args:
+            page (int): The page number (default: 1)
+            page_size (int): The number of items per page (default: 10)
+
+        Returns:
+            Dict: Dictionary containing pagination metadata
+        """
+        data = self.get_page(page, page_size)
+        total_pages = math.ceil(self.storage().count() / page_size)
+
+        return {
+            'page_size': len(data),
+            'page': page,
+            'data': data,
+            'next_page': page + 1 if page < total_pages else None,
+            'prev_page': page - 1 if page > 1 else None,
+            'total_pages': total_pages
+        }
+
+    def get_hyper_index(self, index: int = None, page_size: int = 10) -> Dict:
+        """
+        Get deletion-resilient hypermedia pagination information
+
+        Args:
+            index (int): The start index (default: None)
+            page_size (int): The number of items per page (default: 10)
+
+        Returns:
+            Dict: Dictionary containing pagination metadata
+        """
+        total_items = self.storage().count()
+
+        if index is None:
+            index = 0
+
+        assert isinstance(index, int) and index >= 0 and index < total_items
+        assert isinstance(page_size, int) and page_size > 0
+
+        found = self.storage().live_after(index, page_size)
+        next_index = None
+        if len(found) == page_size and found[-1][0] + 1 < total_items:
+            next_index = found[-1][0] + 1
+
+        return {
+            'index': index,
+            'next_index': next_index,
+            'page_size': page_size,
+            'data': [row for _, row in found]
+        }
+
+    def delete(self, index: int) -> bool:
+        """
+        Delete a row by its position in the original dataset
+        """
+        assert isinstance(index, int) and index >= 0
+        return self.storage().delete((index,)) == 1
+
+    def delete_many(self, indexes: Iterable[int]) -> int:
+        """
+        Delete several rows by their positions in the original dataset
+        """
+        return self.storage().delete(indexes)
+
+
+def compare(path: str, calls: int = 1000, page_size: int = 10,
+            seed: int = 0) -> Dict[str, Dict]:
+    """
+    Time every pagination call on both backends, checking that they
+    return identical results.
+
+    Args:
+        path: Path of the CSV file
+        calls: Number of timed calls per method
+        page_size: Page size of every call
+        seed: Seed of the random pages and deletions
+
+    Returns:
+        Dict[str, Dict]: Open time and latency percentiles per backend
+    """
+    report = {}
+    servers = {}
+    for name, open_storage in (('csv', lambda: CSVStorage(path)),
+                               ('sqlite', lambda: SQLiteStorage(path))):
+        started = time.perf_counter()
+        servers[name] = Server(open_storage())
+        report[name] = {'open_s': round(time.perf_counter() - started, 4)}
+
+    count = servers['csv'].storage().count()
+    rng = random.Random(seed)
+    deleted = rng.sample(range(count), count // 10)
+    for server in servers.values():
+        server.delete_many(deleted)
+
+    workload = [(method, rng.randint(1, max(1, count // page_size))
+                 if method != 'get_hyper_index' else rng.randrange(count))
+                for method in ('get_page', 'get_hyper', 'get_hyper_index')
+                for _ in range(calls)]
+
+    for name, server in servers.items():
+        latencies = {}
+        for method, argument in workload:
+            started = time.perf_counter()
+            getattr(server, method)(argument, page_size)
+            latencies.setdefault(method, []).append(
+                time.perf_counter() - started)
+        report[name].update({method: summarize(values)
+                             for method, values in latencies.items()})
+
+    for method, argument in workload:
+        results = [getattr(server, method)(argument, page_size)
+                   for server in servers.values()]
+        assert results[0] == results[1], (method, argument)
+
+    for server in servers.values():
+        server.storage().close()
+    return report
+
+
+if __name__ == "__main__":
+    server = Server(SQLiteStorage(Server.DATA_FILE))
+
+    print(server.get_hyper(2, 2))
+    print(server.get_hyper_index(3, 2))
+    server.storage().close()
+    print("---")
+    print(json.dumps(compare(Server.DATA_FILE, calls=200)))
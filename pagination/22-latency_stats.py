@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Latency statistics shared by the benchmarks
+"""
+
+from typing import Dict, List, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted sequence.
+
+    Args:
+        values: The sorted values
+        pct: The percentile, between 0 and 100
+
+    Returns:
+        float: The value at that percentile, 0.0 for an empty sequence
+    """
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """
+    Latency percentiles of a list of durations, in microseconds.
+    """
+    latencies = sorted(latencies)
+    return {
+        'calls': len(latencies),
+        'p50_us': round(percentile(latencies, 50) * 1e6, 2),
+        'p90_us': round(percentile(latencies, 90) * 1e6, 2),
+        'p99_us': round(percentile(latencies, 99) * 1e6, 2),
+        'max_us': round(latencies[-1] * 1e6, 2) if latencies else 0.0,
+    }
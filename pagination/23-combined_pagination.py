@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Hypermedia and deletion-resilient pagination over one shared dataset
+"""
+
+HyperServer = __import__('2-hypermedia_pagination').Server
+DelServer = __import__('3-hypermedia_del_pagination').Server
+
+
+class Server(DelServer):
+    """Server class to paginate a database of popular baby names
+    with every pagination mode sharing one dataset.
+    """
+    get_page = HyperServer.get_page
+    get_hyper = HyperServer.get_hyper
+
+    def preload(self) -> None:
+        """Load the dataset and its indexes ahead of the first request
+        """
+        self.dataset()
+        self.indexed_dataset()
+        self.live_index()
+
+
+if __name__ == "__main__":
+    server = Server()
+    server.preload()
+
+    print(server.get_hyper(2, 2))
+    print(server.get_hyper_index(3, 2))
@@ -5,7 +5,180 @@ Deletion-resilient hypermedia pagination
 
 import csv
 import math
-from typing import List, Dict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class LiveIndex:
+    """Fenwick tree over row positions that tracks which rows are live.
+
+    Counting the live rows before a position and finding the k-th live
+    row both take O(log n), whatever the number of deleted rows.
+    """
+
+    def __init__(self, size: int):
+        """
+        Initialize a LiveIndex where every position is live.
+
+        Args:
+            size: Number of row positions
+        """
+        self.size = size
+        self.count = size
+        self.__live = bytearray(b'\x01') * size
+        self.__tree = [i & -i for i in range(size + 1)]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, position: int) -> bool:
+        return 0 <= position < self.size and bool(self.__live[position])
+
+    def discard(self, position: int) -> bool:
+        """
+        Mark a position as deleted.
+
+        Args:
+            position: The row position to delete
+
+        Returns:
+            bool: True if the position was live, False otherwise
+        """
+        if position not in self:
+            return False
+        self.__live[position] = 0
+        self.count -= 1
+        i = position + 1
+        while i <= self.size:
+            self.__tree[i] -= 1
+            i += i & -i
+        return True
+
+    def extend(self, count: int) -> None:
+        """
+        Append live positions at the end.
+
+        Args:
+            count: Number of positions to append
+        """
+        for _ in range(count):
+            self.size += 1
+            self.count += 1
+            self.__live.append(1)
+            i = self.size
+            self.__tree.append(1 + self.rank(i - 1) - self.rank(i - (i & -i)))
+
+    def copy(self) -> 'LiveIndex':
+        """
+        Independent copy, so that a new version can be changed while
+        readers keep using this one.
+        """
+        clone = LiveIndex(0)
+        clone.size = self.size
+        clone.count = self.count
+        clone.__live = bytearray(self.__live)
+        clone.__tree = list(self.__tree)
+        return clone
+
+    def rank(self, position: int) -> int:
+        """
+        Count the live positions strictly before position.
+        """
+        total = 0
+        i = min(position, self.size)
+        while i > 0:
+            total += self.__tree[i]
+            i -= i & -i
+        return total
+
+    def select(self, rank: int) -> Optional[int]:
+        """
+        Find the position of the live row with the given rank (0-based).
+
+        Returns:
+            Optional[int]: The position, or None if rank >= count
+        """
+        if not 0 <= rank < self.count:
+            return None
+        position = 0
+        remaining = rank + 1
+        step = 1 << self.size.bit_length()
+        while step:
+            candidate = position + step
+            if candidate <= self.size and self.__tree[candidate] < remaining:
+                position = candidate
+                remaining -= self.__tree[candidate]
+            step >>= 1
+        return position
+
+
+def hyper_positions(indexed_dataset: Dict[int, List], live: LiveIndex,
+                    index: int = None,
+                    page_size: int = 10) -> Tuple[List[int], Optional[int]]:
+    """
+    Find the positions of the page of live rows starting at index.
+
+    Args:
+        indexed_dataset (Dict[int, List]): Live rows by original position
+        live (LiveIndex): Index of the live positions
+        index (int): The start index (default: None)
+        page_size (int): The number of items per page (default: 10)
+
+    Returns:
+        Tuple[List[int], Optional[int]]: The positions of the rows, and
+        the index of the next page or None on the last one
+    """
+    total_items = len(live)
+
+    if index is None:
+        index = 0
+
+    assert isinstance(index, int) and index >= 0 and index < total_items
+    assert isinstance(page_size, int) and page_size > 0
+
+    positions = []
+    current_index = index
+    rank = live.rank(index)
+
+    while len(positions) < page_size and rank < live.count:
+        position = live.select(rank)
+        if position not in indexed_dataset:
+            # Removed straight from the mapping: forget it and retry
+            live.discard(position)
+            continue
+        positions.append(position)
+        rank += 1
+        current_index = position + 1
+
+    if len(positions) < page_size:
+        current_index = total_items
+
+    next_index = current_index if current_index < total_items else None
+    return positions, next_index
+
+
+def hyper_index(indexed_dataset: Dict[int, List], live: LiveIndex,
+                index: int = None, page_size: int = 10) -> Dict:
+    """
+    Collect the page of live rows starting at index.
+
+    Args:
+        indexed_dataset (Dict[int, List]): Live rows by original position
+        live (LiveIndex): Index of the live positions
+        index (int): The start index (default: None)
+        page_size (int): The number of items per page (default: 10)
+
+    Returns:
+        Dict: Dictionary containing pagination metadata
+    """
+    positions, next_index = hyper_positions(indexed_dataset, live,
+                                            index, page_size)
+
+    return {
+        'index': 0 if index is None else index,
+        'next_index': next_index,
+        'page_size': page_size,
+        'data': [indexed_dataset[position] for position in positions]
+    }
 
 
 class Server:
@@ -16,6 +189,7 @@ class Server:
     def __init__(self):
         self.__dataset = None
         self.__indexed_dataset = None
+        self.__live = None
 
     def dataset(self) -> List[List]:
         """Cached dataset
@@ -38,44 +212,79 @@ class Server:
             }
         return self.__indexed_dataset
 
-    def get_hyper_index(self, index: int = None, page_size: int = 10) -> Dict:
+    def live_index(self) -> LiveIndex:
+        """Cached index of the rows that have not been deleted
         """
-        Get deletion-resilient hypermedia pagination information
+        if self.__live is None:
+            indexed_dataset = self.indexed_dataset()
+            self.__live = LiveIndex(len(self.dataset()))
+            for position in range(len(self.__live)):
+                if position not in indexed_dataset:
+                    self.__live.discard(position)
+        return self.__live
+
+    def extend(self, rows: List[List]) -> None:
+        """
+        Append rows to the dataset and to its indexes, in place.
 
         Args:
-            index (int): The start index (default: None)
-            page_size (int): The number of items per page (default: 10)
+            rows (List[List]): The new rows
+        """
+        dataset = self.dataset()
+        start = len(dataset)
+        dataset.extend(rows)
+        if self.__indexed_dataset is not None:
+            self.__indexed_dataset.update(enumerate(rows, start))
+        if self.__live is not None:
+            self.__live.extend(len(rows))
+
+    def reset(self) -> None:
+        """Forget the loaded dataset and its indexes
+        """
+        self.__dataset = None
+        self.__indexed_dataset = None
+        self.__live = None
+
+    def delete(self, index: int) -> bool:
+        """
+        Delete a row by its position in the original dataset.
+
+        Args:
+            index (int): Position of the row to delete
 
         Returns:
-            Dict: Dictionary containing pagination metadata
+            bool: True if a row was deleted, False if it was already gone
         """
-        indexed_dataset = self.indexed_dataset()
-        total_items = len(indexed_dataset)
+        assert isinstance(index, int) and index >= 0
+        live = self.live_index()
+        self.indexed_dataset().pop(index, None)
+        return live.discard(index)
 
-        if index is None:
-            index = 0
+    def delete_many(self, indexes: Iterable[int]) -> int:
+        """
+        Delete several rows by their positions in the original dataset.
 
-        assert isinstance(index, int) and index >= 0 and index < total_items
-        assert isinstance(page_size, int) and page_size > 0
+        Args:
+            indexes (Iterable[int]): Positions of the rows to delete
 
-        data = []
-        current_index = index
-        items_collected = 0
+        Returns:
+            int: Number of rows actually deleted
+        """
+        return sum(self.delete(index) for index in indexes)
 
-        while current_index < total_items and items_collected < page_size:
-            if current_index in indexed_dataset:
-                data.append(indexed_dataset[current_index])
-                items_collected += 1
-            current_index += 1
+    def get_hyper_index(self, index: int = None, page_size: int = 10) -> Dict:
+        """
+        Get deletion-resilient hypermedia pagination information
 
-        next_index = current_index if current_index < total_items else None
+        Args:
+            index (int): The start index (default: None)
+            page_size (int): The number of items per page (default: 10)
 
-        return {
-            'index': index,
-            'next_index': next_index,
-            'page_size': page_size,
-            'data': data
-        }
+        Returns:
+            Dict: Dictionary containing pagination metadata
+        """
+        return hyper_index(self.indexed_dataset(), self.live_index(),
+                           index, page_size)
 
 
 if __name__ == "__main__":
@@ -101,7 +310,7 @@ if __name__ == "__main__":
     print(server.get_hyper_index(res.get('next_index'), page_size))
 
     # 3- remove the first index
-    del server._Server__indexed_dataset[res.get('index')]
+    server.delete(res.get('index'))
     print("Nb items: {}".format(len(server._Server__indexed_dataset)))
 
     # 4- request again index -> the first data retrieves is not the same
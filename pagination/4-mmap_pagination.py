@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped pagination backed by a persistent row-offset index
+"""
+
+import array
+import csv
+import io
+import math
+import mmap
+import os
+from typing import Dict, List
+index_range = __import__('0-simple_helper_function').index_range
+
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = 0x3244495750414E50
+
+
+def ends_inside_quotes(line: bytes, inside_quotes: bool = False) -> bool:
+    """
+    Tell whether a line of a CSV record ends inside a quoted field.
+
+    Quotes are read as csv.reader reads them: a quote only opens a quoted
+    field at the very start of a field, two quotes in a quoted field stand
+    for one, and any other quote is part of the value.
+
+    Args:
+        line: The line, starting a record unless inside_quotes
+        inside_quotes: Whether the line continues a quoted field
+
+    Returns:
+        bool: True if the newline ending the line belongs to a field
+    """
+    position = 0
+    field_start = not inside_quotes
+    while True:
+        if inside_quotes:
+            close = line.find(b'"', position)
+            if close == -1:
+                return True
+            if line.startswith(b'"', close + 1):
+                position = close + 2
+            else:
+                inside_quotes = False
+                field_start = False
+                position = close + 1
+        elif field_start and line.startswith(b'"', position):
+            inside_quotes = True
+            position += 1
+        else:
+            comma = line.find(b',', position)
+            if comma == -1:
+                return False
+            field_start = True
+            position = comma + 1
+
+
+def skip_record(data: bytes, position: int) -> int:
+    """
+    Find the end of the CSV record starting at position.
+
+    Only the lines holding a quote are scanned field by field.
+
+    Args:
+        data: CSV bytes, or the mapped contents of a CSV file
+        position: Offset of a record boundary
+
+    Returns:
+        int: Offset just past the newline ending the record, or -1 if that
+        newline is not in data
+    """
+    inside_quotes = False
+    while True:
+        newline = data.find(b'\n', position)
+        if newline == -1:
+            return -1
+        if inside_quotes or data.find(b'"', position, newline) != -1:
+            inside_quotes = ends_inside_quotes(data[position:newline],
+                                               inside_quotes)
+        position = newline + 1
+        if not inside_quotes:
+            return position
+
+
+def build_row_index(data: mmap.mmap) -> array.array:
+    """
+    Scan a CSV buffer and record the byte offset of every data row.
+
+    Newlines inside quoted fields do not end a record, so fields spanning
+    several lines are kept in one row, exactly as csv.reader would read
+    them.
+
+    Args:
+        data: The mapped contents of the CSV file
+
+    Returns:
+        array.array: Start offset of each data row (header excluded),
+        followed by one sentinel offset marking the end of the last row
+    """
+    offsets = array.array('Q')
+    size = len(data)
+    position = 0
+
+    while position < size:
+        offsets.append(position)
+        end = skip_record(data, position)
+        position = size if end == -1 else end
+    offsets.append(size)
+
+    # Drop the header row
+    return offsets[1:] if len(offsets) > 1 else offsets
+
+
+def load_row_index(path: str, data: mmap.mmap) -> array.array:
+    """
+    Load the row-offset index persisted next to path, rebuilding it when
+    it is missing or was built for a different version of the file.
+
+    Args:
+        path: Path of the CSV file
+        data: The mapped contents of the CSV file
+
+    Returns:
+        array.array: The row-offset index of the file
+    """
+    stat = os.stat(path)
+    key = [INDEX_MAGIC, stat.st_size, stat.st_mtime_ns]
+    index_path = path + INDEX_SUFFIX
+
+    try:
+        with open(index_path, 'rb') as f:
+            header = array.array('Q')
+            header.fromfile(f, len(key) + 1)
+            if header.tolist()[:len(key)] == key:
+                offsets = array.array('Q')
+                offsets.fromfile(f, header[-1])
+                return offsets
+    except (OSError, EOFError):
+        pass
+
+    offsets = build_row_index(data)
+    try:
+        with open(index_path, 'wb') as f:
+            array.array('Q', key + [len(offsets)]).tofile(f)
+            offsets.tofile(f)
+    except OSError:
+        # The index is only a cache: a read-only directory is not an error
+        pass
+
+    return offsets
+
+
+class Server:
+    """Server class to paginate a database of popular baby names
+    straight from a memory-mapped CSV file.
+    """
+    DATA_FILE = "Popular_Baby_Names.csv"
+
+    def __init__(self):
+        self.__file = None
+        self.__data = None
+        self.__offsets = None
+
+    def row_index(self) -> array.array:
+        """Cached row-offset index
+        """
+        if self.__offsets is None:
+            if os.path.getsize(self.DATA_FILE) == 0:
+                # An empty file cannot be mapped, and holds no rows
+                self.__offsets = array.array('Q', [0])
+            else:
+                self.__file = open(self.DATA_FILE, 'rb')
+                self.__data = mmap.mmap(self.__file.fileno(), 0,
+                                        access=mmap.ACCESS_READ)
+                self.__offsets = load_row_index(self.DATA_FILE, self.__data)
+
+        return self.__offsets
+
+    def row_count(self) -> int:
+        """Number of data rows in the file
+        """
+        return len(self.row_index()) - 1
+
+    def rows(self, start: int, stop: int) -> List[List]:
+        """
+        Parse only the rows in [start, stop) from the mapped file.
+
+        Args:
+            start (int): Index of the first row
+            stop (int): Index one past the last row
+
+        Returns:
+            List[List]: The parsed rows
+        """
+        offsets = self.row_index()
+        stop = min(stop, len(offsets) - 1)
+        if start >= stop:
+            return []
+
+        text = self.__data[offsets[start]:offsets[stop]].decode('utf-8')
+        return list(csv.reader(io.StringIO(text, newline=None)))
+
+    def dataset(self) -> List[List]:
+        """Whole dataset, parsed on demand
+        """
+        return self.rows(0, self.row_count())
+
+    def get_page(self, page: int = 1, page_size: int = 10) -> List[List]:
+        """
+        Get a page from the dataset
+
+        Args:
+            page (int): The page number (default: 1)
+            page_size (int): The number of items per page (default: 10)
+
+        Returns:
+            List[List]: The requested page of data
+        """
+        assert isinstance(page, int) and page > 0
+        assert isinstance(page_size, int) and page_size > 0
+
+        start_index, end_index = index_range(page, page_size)
+        return self.rows(start_index, end_index)
+
+    def get_hyper(self, page: int = 1, page_size: int = 10) -> Dict:
+        """
+        Get hypermedia pagination information
+
+        Args:
+            page (int): The page number (default: 1)
+            page_size (int): The number of items per page (default: 10)
+
+        Returns:
+            Dict: Dictionary containing pagination metadata
+        """
+        data = self.get_page(page, page_size)
+        total_pages = math.ceil(self.row_count() / page_size)
+
+        return {
+            'page_size': len(data),
+            'page': page,
+            'data': data,
+            'next_page': page + 1 if page < total_pages else None,
+            'prev_page': page - 1 if page > 1 else None,
+            'total_pages': total_pages
+        }
+
+    def close(self) -> None:
+        """Release the memory map and the underlying file
+        """
+        if self.__data is not None:
+            self.__data.close()
+            self.__file.close()
+        self.__file = None
+        self.__data = None
+        self.__offsets = None
+
+
+if __name__ == "__main__":
+    server = Server()
+
+    print("Nb rows: {}".format(server.row_count()))
+    print(server.get_page(1, 3))
+    print(server.get_page(3, 2))
+    print(server.get_page(3000, 100))
+    print(server.get_hyper(2, 2))
+
+    server.close()
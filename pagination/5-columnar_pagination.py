@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Columnar, typed in-memory pagination
+"""
+
+import array
+import csv
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+HyperServer = __import__('2-hypermedia_pagination').Server
+
+
+INT_TYPECODES = ('b', 'h', 'i', 'q')
+CODE_TYPECODES = ('B', 'H', 'I', 'L')
+
+
+def smallest_typecode(low: int, high: int, typecodes: Sequence[str]) -> str:
+    """
+    Pick the narrowest array typecode able to hold every value in a range.
+
+    Args:
+        low: The smallest value to store
+        high: The largest value to store
+        typecodes: Candidate typecodes, narrowest first
+
+    Returns:
+        str: The first typecode whose range covers [low, high]
+    """
+    for typecode in typecodes:
+        bits = array.array(typecode).itemsize * 8
+        if typecode.islower():
+            lowest, highest = -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+        else:
+            lowest, highest = 0, (1 << bits) - 1
+        if lowest <= low and high <= highest:
+            return typecode
+    return typecodes[-1]
+
+
+def as_int(value: str) -> Optional[int]:
+    """
+    Parse value as an int only if it round-trips back to the same string,
+    so that rebuilt rows are identical to the ones csv.reader returned.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        return None
+    if str(number) != value or not -(1 << 63) <= number < (1 << 63):
+        return None
+    return number
+
+
+class ColumnStore:
+    """Read-only sequence of rows stored column by column.
+
+    Columns holding only integers are kept in the narrowest array.array
+    that fits them; every other column is dictionary-encoded as an array
+    of codes into a list of distinct values. Rows are only rebuilt as
+    lists of str when they are read.
+
+    Rows that are not as wide as the header, blank ones included, are
+    kept whole on the side, so every row reads back as csv.reader
+    returned it.
+    """
+
+    def __init__(self, header: List[str], columns: List[Sequence[int]],
+                 dictionaries: List[Optional[List[str]]],
+                 ragged: Dict[int, List[str]] = None):
+        """
+        Initialize a ColumnStore from already encoded columns.
+
+        Args:
+            header: Column names
+            columns: One integer sequence per column, holding either the
+                values themselves or codes into the matching dictionary
+            dictionaries: Distinct values of each dictionary-encoded
+                column, None for integer columns
+            ragged: Rows not as wide as the header, by index, whose
+                column values are placeholders
+        """
+        self.header = header
+        self.columns = columns
+        self.dictionaries = dictionaries
+        self.ragged = ragged or {}
+        self.__ragged_indexes = sorted(self.ragged)
+
+    @classmethod
+    def from_rows(cls, header: List[str],
+                  rows: Iterable[List[str]]) -> 'ColumnStore':
+        """
+        Encode rows in a single streaming pass.
+
+        Every column starts out as an integer column and is switched to
+        dictionary encoding the first time it holds a non-integer value.
+        Rows not as wide as the header are set aside, and hold a 0 in
+        every column.
+
+        Args:
+            header: Column names
+            rows: Rows of str
+
+        Returns:
+            ColumnStore: The encoded rows
+        """
+        width = len(header)
+        columns = [array.array('q') for _ in range(width)]
+        lookups: List[Optional[Dict[str, int]]] = [None] * width
+        ragged: Dict[int, List[str]] = {}
+
+        for number, row in enumerate(rows):
+            if len(row) != width or not width:
+                ragged[number] = row
+                for column in columns:
+                    column.append(0)
+                continue
+            for i, value in enumerate(row):
+                lookup = lookups[i]
+                if lookup is None:
+                    parsed = as_int(value)
+                    if parsed is not None:
+                        columns[i].append(parsed)
+                        continue
+                    lookup = lookups[i] = {}
+                    columns[i] = array.array('L', (
+                        lookup.setdefault(str(v), len(lookup))
+                        for v in columns[i]))
+                columns[i].append(lookup.setdefault(value, len(lookup)))
+
+        dictionaries: List[Optional[List[str]]] = []
+        for i, lookup in enumerate(lookups):
+            column = columns[i]
+            if lookup is None:
+                dictionaries.append(None)
+                low, high = (min(column), max(column)) if column else (0, 0)
+                typecode = smallest_typecode(low, high, INT_TYPECODES)
+            else:
+                dictionaries.append(list(lookup))
+                typecode = smallest_typecode(0, len(lookup), CODE_TYPECODES)
+            columns[i] = array.array(typecode, column)
+
+        return cls(header, columns, dictionaries, ragged)
+
+    def column(self, name: str) -> Sequence:
+        """
+        Typed values of one column.
+
+        Args:
+            name: Column name as found in the header
+
+        Returns:
+            Sequence: The integer array of an integer column, or the
+            decoded values of a dictionary-encoded column
+        """
+        i = self.header.index(name)
+        values = self.dictionaries[i]
+        if values is None:
+            return self.columns[i]
+        return [values[code] for code in self.columns[i]]
+
+    def rows(self, start: int, stop: int) -> List[List[str]]:
+        """
+        Rebuild the rows in [start, stop).
+
+        Args:
+            start: Index of the first row
+            stop: Index one past the last row
+
+        Returns:
+            List[List[str]]: The rows, exactly as csv.reader returned them
+        """
+        decoded = []
+        for column, values in zip(self.columns, self.dictionaries):
+            part = column[start:stop]
+            if values is None:
+                decoded.append(map(str, part))
+            else:
+                decoded.append(map(values.__getitem__, part))
+        rows = [list(row) for row in zip(*decoded)]
+
+        indexes = self.__ragged_indexes
+        if not self.columns:
+            rows = [[] for _ in range(max(0, min(stop, len(self)) - start))]
+        for index in indexes[bisect_left(indexes, start):
+                             bisect_left(indexes, stop)]:
+            rows[index - start] = list(self.ragged[index])
+        return rows
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else len(self.ragged)
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            rows = self.rows(start, stop)
+            return rows if step == 1 else rows[::step]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("row index out of range")
+        return self.rows(key, key + 1)[0]
+
+    def __iter__(self) -> Iterator[List[str]]:
+        for start in range(0, len(self), 1024):
+            yield from self.rows(start, start + 1024)
+
+
+def load_columns(path: str) -> ColumnStore:
+    """
+    Parse a CSV file straight into a ColumnStore, one row at a time.
+
+    Args:
+        path: Path of the CSV file
+
+    Returns:
+        ColumnStore: The encoded data rows, header excluded
+    """
+    with open(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        return ColumnStore.from_rows(header, reader)
+
+
+class Server(HyperServer):
+    """Server class to paginate a database of popular baby names
+    kept in compact columnar form.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.__columns = None
+
+    def dataset(self) -> ColumnStore:
+        """Cached dataset
+        """
+        if self.__columns is None:
+            self.__columns = load_columns(self.DATA_FILE)
+
+        return self.__columns
+
+
+if __name__ == "__main__":
+    server = Server()
+
+    print(server.get_page(1, 3))
+    print(server.get_hyper(2, 2))
+    print(server.get_hyper(3000, 100))
+    print(server.dataset().column(server.dataset().header[0])[:5])
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Pagination served from a persistent, memory-mapped binary snapshot
+"""
+
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Optional
+columnar = __import__('5-columnar_pagination')
+ColumnStore = columnar.ColumnStore
+load_columns = columnar.load_columns
+
+
+SNAPSHOT_SUFFIX = ".snap"
+SNAPSHOT_MAGIC = b"PGSNAP01"
+PREAMBLE = struct.Struct("<8sQ")
+ALIGNMENT = 8
+
+
+def snapshot_key(path: str) -> dict:
+    """
+    Identify the version of a CSV file a snapshot was built from.
+
+    Args:
+        path: Path of the CSV file
+
+    Returns:
+        dict: The file's size and modification time
+    """
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'byteorder': sys.byteorder}
+
+
+def write_snapshot(store: ColumnStore, path: str, key: dict) -> None:
+    """
+    Write a ColumnStore to a snapshot file.
+
+    The file holds a JSON metadata block followed by the raw bytes of
+    every column, each aligned so that it can be mapped back in place.
+    It is written to a temporary file first and renamed, so concurrent
+    readers never see a partial snapshot.
+
+    Args:
+        store: The columns to save
+        path: Path of the snapshot file
+        key: Version of the CSV file the columns were parsed from
+    """
+    # Columns mapped from a snapshot are memoryviews, copied as bytes
+    columns = [array.array(column.format, bytes(column))
+               if not isinstance(column, array.array) else column
+               for column in store.columns]
+    meta = dict(key, rows=len(store), header=store.header, columns=[],
+                ragged=sorted(store.ragged.items()))
+    offset = 0
+    for column, values in zip(columns, store.dictionaries):
+        meta['columns'].append({'typecode': column.typecode,
+                                'offset': offset,
+                                'dictionary': values})
+        size = len(column) * column.itemsize
+        offset += size + (-size % ALIGNMENT)
+
+    blob = json.dumps(meta).encode('utf-8')
+    blob += b' ' * (-(PREAMBLE.size + len(blob)) % ALIGNMENT)
+
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(SNAPSHOT_MAGIC, len(blob)))
+        f.write(blob)
+        for column in columns:
+            column.tofile(f)
+            f.write(b'\0' * (-(len(column) * column.itemsize) % ALIGNMENT))
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str, key: dict) -> Optional[ColumnStore]:
+    """
+    Map a snapshot file back into a ColumnStore without copying columns.
+
+    Args:
+        path: Path of the snapshot file
+        key: Version of the CSV file the snapshot must match
+
+    Returns:
+        Optional[ColumnStore]: The columns, or None if the snapshot is
+        missing, unreadable, truncated or stale
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, length = PREAMBLE.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC:
+            return None
+        start = PREAMBLE.size + length
+        meta = json.loads(data[PREAMBLE.size:start].decode('utf-8'))
+        if any(meta.get(name) != value for name, value in key.items()):
+            return None
+
+        view = memoryview(data)
+        columns = []
+        for column in meta['columns']:
+            itemsize = array.array(column['typecode']).itemsize
+            offset = start + column['offset']
+            end = offset + meta['rows'] * itemsize
+            if column['offset'] < 0 or end > len(data):
+                return None
+            columns.append(view[offset:end].cast(column['typecode']))
+        ragged = {index: row for index, row in meta['ragged']}
+    except (struct.error, ValueError, KeyError, TypeError):
+        return None
+
+    return ColumnStore(meta['header'], columns,
+                       [column['dictionary'] for column in meta['columns']],
+                       ragged)
+
+
+def load_snapshot(csv_path: str) -> ColumnStore:
+    """
+    Load the columns of a CSV file from its snapshot, parsing the CSV and
+    rewriting the snapshot first when it is missing or stale.
+
+    Args:
+        csv_path: Path of the CSV file
+
+    Returns:
+        ColumnStore: The data rows of the file
+    """
+    path = csv_path + SNAPSHOT_SUFFIX
+    key = snapshot_key(csv_path)
+
+    store = read_snapshot(path, key)
+    if store is None:
+        store = load_columns(csv_path)
+        try:
+            write_snapshot(store, path, key)
+        except OSError:
+            # The snapshot is only a cache: a read-only directory is fine
+            pass
+
+    return store
+
+
+class Server(columnar.Server):
+    """Server class to paginate a database of popular baby names
+    loaded from a binary snapshot whenever one is fresh.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.__snapshot = None
+
+    def dataset(self) -> ColumnStore:
+        """Cached dataset
+        """
+        if self.__snapshot is None:
+            self.__snapshot = load_snapshot(self.DATA_FILE)
+
+        return self.__snapshot
+
+
+if __name__ == "__main__":
+    server = Server()
+
+    print(server.get_page(1, 3))
+    print(server.get_hyper(2, 2))
+    print(server.get_hyper(3000, 100))
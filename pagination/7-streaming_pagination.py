@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Streaming pagination over the CSV file in constant memory
+"""
+
+import csv
+import math
+from itertools import islice
+from typing import Dict, Iterator, List
+HyperServer = __import__('2-hypermedia_pagination').Server
+
+
+class Server(HyperServer):
+    """Server class to paginate a database of popular baby names,
+    with generators that read the file incrementally.
+    """
+
+    def iter_rows(self, start: int = 0, stop: int = None) -> Iterator[List]:
+        """
+        Yield the data rows in [start, stop) straight from the file.
+
+        Args:
+            start (int): Index of the first row (default: 0)
+            stop (int): Index one past the last row (default: None, the
+                end of the file)
+
+        Yields:
+            List: One row at a time
+        """
+        assert isinstance(start, int) and start >= 0
+        assert stop is None or (isinstance(stop, int) and stop >= start)
+
+        with open(self.DATA_FILE) as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            yield from islice(reader, start, stop)
+
+    def count_rows(self) -> int:
+        """Number of data rows, counted without keeping them
+        """
+        return sum(1 for _ in self.iter_rows())
+
+    def iter_pages(self, page_size: int = 10) -> Iterator[List[List]]:
+        """
+        Yield every page in order, as get_page would return them.
+
+        Args:
+            page_size (int): The number of items per page (default: 10)
+
+        Yields:
+            List[List]: One page of data at a time
+        """
+        assert isinstance(page_size, int) and page_size > 0
+
+        rows = self.iter_rows()
+        page = list(islice(rows, page_size))
+        while page:
+            yield page
+            page = list(islice(rows, page_size))
+
+    def iter_hyper(self, page_size: int = 10) -> Iterator[Dict]:
+        """
+        Yield every page in order, as get_hyper would return them.
+
+        The file is read twice: once to count the rows for total_pages,
+        then once more to stream the pages.
+
+        Args:
+            page_size (int): The number of items per page (default: 10)
+
+        Yields:
+            Dict: Dictionary containing pagination metadata
+        """
+        assert isinstance(page_size, int) and page_size > 0
+
+        total_pages = math.ceil(self.count_rows() / page_size)
+        for page, data in enumerate(self.iter_pages(page_size), 1):
+            yield {
+                'page_size': len(data),
+                'page': page,
+                'data': data,
+                'next_page': page + 1 if page < total_pages else None,
+                'prev_page': page - 1 if page > 1 else None,
+                'total_pages': total_pages
+            }
+
+
+if __name__ == "__main__":
+    server = Server()
+
+    print(list(server.iter_rows(3, 5)))
+    print("---")
+    for hyper in islice(server.iter_hyper(2), 2):
+        print(hyper)
+    print("---")
+    print(sum(len(page) for page in server.iter_pages(1000)))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Asyncio HTTP front end for the pagination Server
+"""
+
+import asyncio
+import json
+from typing import Any, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+Server = __import__('23-combined_pagination').Server
+
+
+ROUTES = {
+    '/get_page': ('get_page', ('page', 'page_size')),
+    '/get_hyper': ('get_hyper', ('page', 'page_size')),
+    '/get_hyper_index': ('get_hyper_index', ('index', 'page_size')),
+}
+REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+}
+MAX_HEADER_SIZE = 64 * 1024
+
+
+class PaginationHTTPServer:
+    """HTTP/1.1 server exposing get_page, get_hyper and get_hyper_index
+    as JSON endpoints, with keep-alive and pipelined requests.
+    """
+    routes = ROUTES
+
+    def __init__(self, server: Server = None, host: str = '127.0.0.1',
+                 port: int = 8000):
+        """
+        Initialize the HTTP front end.
+
+        Args:
+            server: The pagination Server to expose (default: a new one)
+            host: Interface to listen on (default: '127.0.0.1')
+            port: Port to listen on, 0 for any free port (default: 8000)
+        """
+        self.server = server if server is not None else Server()
+        self.host = host
+        self.port = port
+
+    def dispatch(self, method: str, target: str) -> Tuple[int, Any]:
+        """
+        Run the pagination call a request asks for.
+
+        Args:
+            method: The HTTP method
+            target: The request target, path and query string
+
+        Returns:
+            Tuple[int, Any]: The HTTP status and the JSON-able payload,
+            or the JSON body itself as bytes
+        """
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return 404, {'error': 'unknown endpoint {}'.format(url.path)}
+        if method != 'GET':
+            return 405, {'error': 'only GET is supported'}
+
+        name, params = route
+        kwargs = {}
+        for key, value in parse_qsl(url.query):
+            if key not in params:
+                continue
+            try:
+                kwargs[key] = int(value)
+            except ValueError:
+                return 400, {'error': '{} must be an integer'.format(key)}
+
+        try:
+            return 200, getattr(self.server, name)(**kwargs)
+        except AssertionError:
+            return 400, {'error': 'invalid {}'.format(', '.join(params))}
+
+    def response(self, status: int, payload: Any, keep_alive: bool) -> bytes:
+        """
+        Encode a complete HTTP response, whose payload is either JSON-able
+        or an already encoded JSON body.
+        """
+        if isinstance(payload, bytes):
+            body = payload
+        else:
+            body = json.dumps(payload).encode('utf-8')
+        head = ("HTTP/1.1 {} {}\r\n"
+                "Content-Type: application/json\r\n"
+                "Content-Length: {}\r\n"
+                "Connection: {}\r\n\r\n").format(
+                    status, REASONS[status], len(body),
+                    'keep-alive' if keep_alive else 'close')
+        return head.encode('ascii') + body
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """
+        Serve every request sent on one connection, in order.
+
+        Pipelined requests are simply read back to back from the stream,
+        so their responses go out in the order they were received.
+        """
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(self.response(
+                        400, {'error': 'headers too large'}, False))
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ')
+                except ValueError:
+                    writer.write(self.response(
+                        400, {'error': 'malformed request line'}, False))
+                    break
+
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                length = headers.get('content-length', '0')
+                if length.isdigit() and int(length) > 0:
+                    await reader.readexactly(int(length))
+
+                connection = headers.get('connection', '').lower()
+                if version == 'HTTP/1.1':
+                    keep_alive = connection != 'close'
+                else:
+                    keep_alive = connection == 'keep-alive'
+
+                status, payload = self.dispatch(method, target)
+                writer.write(self.response(status, payload, keep_alive))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> asyncio.AbstractServer:
+        """
+        Preload the dataset, then start accepting connections.
+
+        Returns:
+            asyncio.AbstractServer: The listening server
+        """
+        self.server.preload()
+        listener = await asyncio.start_server(
+            self.handle, self.host, self.port, limit=MAX_HEADER_SIZE)
+        self.port = listener.sockets[0].getsockname()[1]
+        return listener
+
+    async def serve_forever(self) -> None:
+        """Serve requests until cancelled
+        """
+        listener = await self.start()
+        async with listener:
+            await listener.serve_forever()
+
+
+def serve(host: str = '127.0.0.1', port: int = 8000,
+          server: Optional[Server] = None) -> None:
+    """
+    Run the HTTP front end in the current thread until interrupted.
+    """
+    http = PaginationHTTPServer(server, host, port)
+    try:
+        asyncio.run(http.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    print("Serving on http://127.0.0.1:8000")
+    serve()
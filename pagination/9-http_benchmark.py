@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency benchmark for the asyncio pagination HTTP server
+"""
+
+import asyncio
+import multiprocessing
+import time
+from typing import Dict, List, Sequence
+PaginationHTTPServer = __import__('8-http_server').PaginationHTTPServer
+percentile = __import__('22-latency_stats').percentile
+
+
+DEFAULT_TARGETS = (
+    '/get_page?page=1&page_size=10',
+    '/get_hyper?page=3&page_size=20',
+    '/get_hyper_index?index=100&page_size=10',
+)
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """
+    Read one HTTP response and return its status code.
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return int(lines[0].split(' ')[1])
+
+
+async def run_connection(host: str, port: int, targets: Sequence[str],
+                         requests: int, depth: int,
+                         latencies: List[float]) -> int:
+    """
+    Send requests on one keep-alive connection, depth at a time.
+
+    Args:
+        host: Server host
+        port: Server port
+        targets: Request targets, sent round-robin
+        requests: Number of requests to send
+        depth: Number of requests pipelined before reading responses
+        latencies: List the latency of every request is appended to
+
+    Returns:
+        int: Number of non-200 responses
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    sent = 0
+    try:
+        while sent < requests:
+            batch = min(depth, requests - sent)
+            payload = b''.join(
+                'GET {} HTTP/1.1\r\nHost: {}\r\n\r\n'.format(
+                    targets[(sent + i) % len(targets)], host).encode('ascii')
+                for i in range(batch))
+            started = time.perf_counter()
+            writer.write(payload)
+            await writer.drain()
+            for _ in range(batch):
+                if await read_response(reader) != 200:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+            sent += batch
+    finally:
+        writer.close()
+    return errors
+
+
+async def benchmark(host: str, port: int,
+                    targets: Sequence[str] = DEFAULT_TARGETS,
+                    connections: int = 10, requests: int = 1000,
+                    depth: int = 1) -> Dict:
+    """
+    Load a running server from several concurrent connections.
+
+    Args:
+        host: Server host
+        port: Server port
+        targets: Request targets, sent round-robin
+        connections: Number of concurrent connections (default: 10)
+        requests: Number of requests per connection (default: 1000)
+        depth: Pipelining depth per connection (default: 1)
+
+    Returns:
+        Dict: Throughput, error count and latency percentiles in ms
+    """
+    latencies: List[float] = []
+    started = time.perf_counter()
+    errors = await asyncio.gather(*(
+        run_connection(host, port, targets, requests, depth, latencies)
+        for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    return {
+        'connections': connections,
+        'depth': depth,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+def run_server(port, ready) -> None:
+    """
+    Serve on localhost in a child process, reporting the bound port.
+    """
+    async def main():
+        http = PaginationHTTPServer(port=port)
+        listener = await http.start()
+        ready.put(http.port)
+        async with listener:
+            await listener.serve_forever()
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_server, args=(0, ready),
+                                      daemon=True)
+    process.start()
+    port = ready.get()
+
+    try:
+        for depth in (1, 8):
+            print(asyncio.run(benchmark('127.0.0.1', port, depth=depth)))
+    finally:
+        process.terminate()
+        process.join()
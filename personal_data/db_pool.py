@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Database Connection Pool Module
+
+This module keeps database connections open between get_db() calls, so
+that connection setup and authentication are only paid once per
+connection. Backends hide whether connections go to MySQL or to a local
+SQLite stand-in.
+"""
+
+import os
+import time
+import sqlite3
+import weakref
+import threading
+import collections
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional, Tuple
+
+
+class DatabaseBackend(ABC):
+    """ Opens and checks the connections of one database """
+
+    @abstractmethod
+    def connect(self) -> Any:
+        """
+        Open a new DB-API connection.
+
+        Returns:
+            The connection
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def is_alive(self, connection: Any) -> bool:
+        """
+        Check that a connection can still be used.
+
+        Args:
+            connection: A connection opened by connect()
+
+        Returns:
+            True if the connection works, False otherwise
+        """
+        raise NotImplementedError
+
+
+class MySQLBackend(DatabaseBackend):
+    """ Connections to a MySQL database """
+
+    def __init__(self, user: str, password: str, host: str, database: str):
+        """
+        Initialize the backend with the database credentials.
+
+        Args:
+            user: MySQL user name
+            password: MySQL password
+            host: MySQL server host
+            database: Name of the database
+        """
+        self.user = user
+        self.password = password
+        self.host = host
+        self.database = database
+
+    def connect(self) -> Any:
+        """ Open a new MySQL connection """
+        # Imported here so that the SQLite stand-in runs without it
+        import mysql.connector
+        return mysql.connector.connect(
+            user=self.user,
+            password=self.password,
+            host=self.host,
+            database=self.database
+        )
+
+    def is_alive(self, connection: Any) -> bool:
+        """ Ping the server, without reconnecting """
+        import mysql.connector
+        try:
+            return connection.is_connected()
+        except mysql.connector.Error:
+            return False
+
+
+class SQLiteBackend(DatabaseBackend):
+    """ Connections to a SQLite database file, as a local stand-in """
+
+    def __init__(self, path: str):
+        """
+        Initialize the backend.
+
+        Args:
+            path: Path of the database file
+        """
+        self.path = path
+
+    def connect(self) -> Any:
+        """ Open a new SQLite connection, usable from any thread """
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def is_alive(self, connection: Any) -> bool:
+        """ Run a trivial query on the connection """
+        try:
+            connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+
+class PooledConnection:
+    """
+    Connection borrowed from a ConnectionPool. Every attribute is the
+    underlying connection's, except close(), which gives it back. If it
+    is garbage-collected without being closed, the pool reclaims its slot.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', connection: Any):
+        self.__pool = pool
+        self.__connection = connection
+        self.__finalizer = weakref.finalize(self, pool.reclaim, connection)
+
+    def __getattr__(self, name: str) -> Any:
+        if self.__connection is None:
+            raise AttributeError(f"connection already closed ({name})")
+        return getattr(self.__connection, name)
+
+    def __enter__(self) -> 'PooledConnection':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """ Give the connection back to its pool """
+        if self.__connection is not None:
+            connection, self.__connection = self.__connection, None
+            self.__finalizer.detach()
+            self.__pool.release(connection)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of at most size open connections.
+
+    Idle connections are reused most recently released first. Those idle
+    longer than idle_timeout are closed, and those idle longer than
+    check_after are health-checked before being handed out again.
+    Connections dropped without close() are closed and their slots freed.
+    """
+
+    # Longest wait between two looks for reclaimed slots
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, backend: DatabaseBackend, size: int = 5,
+                 idle_timeout: float = 300.0, check_after: float = 30.0,
+                 timeout: Optional[float] = None):
+        """
+        Initialize an empty pool.
+
+        Args:
+            backend: Backend opening and checking the connections
+            size: Maximum number of open connections
+            idle_timeout: Seconds after which an idle connection is closed
+            check_after: Seconds of idleness after which a connection is
+                health-checked before reuse, 0 to check every time
+            timeout: Seconds get_db() waits for a connection (default:
+                None, wait forever)
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.backend = backend
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.timeout = timeout
+        self.closed = False
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self.failed_checks = 0
+        self.abandoned = 0
+        self.__open = 0
+        self.__idle: List[Tuple[Any, float]] = []
+        self.__reclaimed: collections.deque = collections.deque()
+        self.__condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """
+        Borrow a connection, opening one if none is idle and the pool is
+        not full, or waiting for one to be released otherwise.
+
+        Args:
+            timeout: Maximum number of seconds to wait (default: forever)
+
+        Returns:
+            The connection, to close() once done with it
+
+        Raises:
+            TimeoutError: If no connection was released in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            candidate = None
+            stale: List[Any] = []
+            try:
+                with self.__condition:
+                    while True:
+                        if self.closed:
+                            raise RuntimeError("connection pool is closed")
+                        stale += self.__collect_stale()
+                        if self.__idle:
+                            candidate, since = self.__idle.pop()
+                            break
+                        if self.__open < self.size:
+                            self.__open += 1
+                            break
+                        wait = self.POLL_INTERVAL
+                        if deadline is not None:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                raise TimeoutError(
+                                    "no database connection available")
+                            wait = min(wait, remaining)
+                        self.__condition.wait(wait)
+            finally:
+                # Close evicted connections outside the lock
+                for connection in stale:
+                    self.__close_quietly(connection)
+
+            # Open a new connection outside the lock
+            if candidate is None:
+                try:
+                    connection = self.backend.connect()
+                except Exception:
+                    self.__forget()
+                    raise
+                with self.__condition:
+                    self.created += 1
+                return PooledConnection(self, connection)
+
+            # Check a long idle connection outside the lock too
+            if (time.monotonic() - since < self.check_after
+                    or self.backend.is_alive(candidate)):
+                with self.__condition:
+                    self.reused += 1
+                return PooledConnection(self, candidate)
+            with self.__condition:
+                self.failed_checks += 1
+            self.__close_quietly(candidate)
+            self.__forget()
+
+    def release(self, connection: Any) -> None:
+        """
+        Take back a borrowed connection, rolling back whatever transaction
+        it left open.
+
+        Args:
+            connection: The underlying connection
+        """
+        try:
+            connection.rollback()
+        except Exception:
+            self.__close_quietly(connection)
+            self.__forget()
+            return
+
+        with self.__condition:
+            if not self.closed:
+                self.__idle.append((connection, time.monotonic()))
+                self.__condition.notify()
+                return
+        self.__close_quietly(connection)
+        self.__forget()
+
+    def reclaim(self, connection: Any) -> None:
+        """
+        Take back the connection of a PooledConnection garbage-collected
+        without being closed. Its state is unknown, so it is closed rather
+        than reused, by the next caller of acquire() or close().
+
+        This may run from the garbage collector in any thread, even one
+        holding the lock, so it only queues the connection and wakes a
+        waiting acquire() if the lock happens to be free.
+
+        Args:
+            connection: The underlying connection
+        """
+        self.__reclaimed.append(connection)
+        if self.__condition.acquire(blocking=False):
+            try:
+                self.__condition.notify()
+            finally:
+                self.__condition.release()
+
+    def close(self) -> None:
+        """
+        Close the idle connections. Borrowed ones are closed when released.
+        """
+        with self.__condition:
+            self.closed = True
+            stale = self.__collect_stale()
+            stale += [connection for connection, _ in self.__idle]
+            self.__open -= len(self.__idle)
+            self.__idle = []
+            self.__condition.notify_all()
+        for connection in stale:
+            self.__close_quietly(connection)
+
+    def stats(self) -> dict:
+        """
+        Counters of the pool.
+
+        Returns:
+            Open and idle connections, and how many were created, reused,
+            evicted for idleness and dropped after a failed health check
+        """
+        with self.__condition:
+            return {
+                'open': self.__open,
+                'idle': len(self.__idle),
+                'created': self.created,
+                'reused': self.reused,
+                'evicted': self.evicted,
+                'failed_checks': self.failed_checks,
+                'abandoned': self.abandoned,
+            }
+
+    def __collect_stale(self) -> List[Any]:
+        """
+        Take out the connections idle for longer than idle_timeout and the
+        reclaimed ones, freeing their slots. Must be called with the lock
+        held; the caller closes them once it is released.
+
+        Returns:
+            The connections to close
+        """
+        now = time.monotonic()
+        stale = [connection for connection, since in self.__idle
+                 if now - since >= self.idle_timeout]
+        if stale:
+            self.__idle = [(connection, since)
+                           for connection, since in self.__idle
+                           if now - since < self.idle_timeout]
+            self.evicted += len(stale)
+        while self.__reclaimed:
+            stale.append(self.__reclaimed.popleft())
+            self.abandoned += 1
+        self.__open -= len(stale)
+        return stale
+
+    def __forget(self) -> None:
+        """
+        Free the slot of a connection that was closed or never opened.
+        """
+        with self.__condition:
+            self.__open -= 1
+            self.__condition.notify()
+
+    @staticmethod
+    def __close_quietly(connection: Any) -> None:
+        """ Close a connection, ignoring errors """
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def backend_from_env() -> DatabaseBackend:
+    """
+    Build the backend described by the PERSONAL_DATA_DB_* variables.
+
+    PERSONAL_DATA_DB_BACKEND selects "mysql" (the default) or "sqlite",
+    for which PERSONAL_DATA_DB_NAME is the path of the database file.
+
+    Returns:
+        The backend
+    """
+    # Get database credentials from environment variables with defaults
+    kind = os.getenv('PERSONAL_DATA_DB_BACKEND', 'mysql')
+    username = os.getenv('PERSONAL_DATA_DB_USERNAME', 'root')
+    password = os.getenv('PERSONAL_DATA_DB_PASSWORD', '')
+    host = os.getenv('PERSONAL_DATA_DB_HOST', 'localhost')
+    database = os.getenv('PERSONAL_DATA_DB_NAME')
+
+    # Check if database name is provided
+    if not database:
+        raise ValueError(
+            "PERSONAL_DATA_DB_NAME environment variable is required")
+
+    if kind == 'sqlite':
+        return SQLiteBackend(database)
+    if kind != 'mysql':
+        raise ValueError(f"unknown PERSONAL_DATA_DB_BACKEND {kind!r}")
+    return MySQLBackend(username, password, host, database)
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Get the shared pool, created on first use from the PERSONAL_DATA_DB_*
+    variables, including PERSONAL_DATA_DB_POOL_SIZE (default: 5),
+    PERSONAL_DATA_DB_POOL_IDLE_TIMEOUT and
+    PERSONAL_DATA_DB_POOL_CHECK_AFTER and PERSONAL_DATA_DB_POOL_TIMEOUT
+    (in seconds, default: 300, 30 and 30).
+
+    Returns:
+        The shared ConnectionPool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = ConnectionPool(
+                backend_from_env(),
+                size=int(os.getenv('PERSONAL_DATA_DB_POOL_SIZE', '5')),
+                idle_timeout=float(
+                    os.getenv('PERSONAL_DATA_DB_POOL_IDLE_TIMEOUT', '300')),
+                check_after=float(
+                    os.getenv('PERSONAL_DATA_DB_POOL_CHECK_AFTER', '30')),
+                timeout=float(
+                    os.getenv('PERSONAL_DATA_DB_POOL_TIMEOUT', '30'))
+            )
+        return _pool
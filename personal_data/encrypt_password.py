@@ -6,15 +6,66 @@ This module provides functionality for hashing
 and verifying passwords using bcrypt.
 """
 
+import os
+import hmac
+import time
+import asyncio
+import hashlib
+import threading
+import collections
 import bcrypt
+from concurrent.futures import (Executor, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 
-def hash_password(password: str) -> bytes:
+# bcrypt work factor: each extra round doubles the cost of a hash
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+_rounds = 12
+
+
+def get_rounds() -> int:
+    """
+    Get the work factor new hashes are made with.
+
+    Returns:
+        The number of bcrypt rounds, as a power of two
+    """
+    return _rounds
+
+
+def set_rounds(rounds: int) -> None:
+    """
+    Set the work factor new hashes are made with.
+
+    Args:
+        rounds: The number of bcrypt rounds, between 4 and 31
+    """
+    global _rounds
+    if (not isinstance(rounds, int)
+            or not MIN_ROUNDS <= rounds <= MAX_ROUNDS):
+        raise ValueError(
+            f"rounds must be between {MIN_ROUNDS} and {MAX_ROUNDS}")
+    _rounds = rounds
+
+
+# Let the environment override the default work factor, checked as above
+try:
+    set_rounds(int(os.getenv('PERSONAL_DATA_BCRYPT_ROUNDS', str(_rounds))))
+except ValueError:
+    raise ValueError(
+        "PERSONAL_DATA_BCRYPT_ROUNDS must be an integer between "
+        f"{MIN_ROUNDS} and {MAX_ROUNDS}") from None
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> bytes:
     """
     Hash a password using bcrypt with salt.
 
     Args:
         password: The plain text password to hash
+        rounds: The work factor (default: get_rounds())
 
     Returns:
         A salted, hashed password as byte string
@@ -23,23 +74,86 @@ def hash_password(password: str) -> bytes:
     password_bytes = password.encode('utf-8')
 
     # Generate salt and hash the password
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds or _rounds)
     hashed_password = bcrypt.hashpw(password_bytes, salt)
 
     return hashed_password
 
 
-def is_valid(hashed_password: bytes, password: str) -> bool:
+def hash_rounds(hashed_password: bytes) -> int:
+    """
+    Read the work factor a hash was made with.
+
+    Args:
+        hashed_password: The hashed password, as "$2b$12$..."
+
+    Returns:
+        The number of bcrypt rounds
+    """
+    return int(hashed_password.split(b'$')[2])
+
+
+def calibrate(target_ms: float = 250.0, min_rounds: int = 10,
+              max_rounds: int = 16, samples: int = 3,
+              apply: bool = False) -> int:
+    """
+    Find the highest work factor whose hashes take at most target_ms on
+    this host.
+
+    The cost of min_rounds is measured, the cost of the higher factors
+    extrapolated from it, since each round doubles the work, and the
+    chosen factor measured in turn to step down if it is still too slow.
+
+    Args:
+        target_ms: Longest acceptable time of one hash, in milliseconds
+        min_rounds: Lowest work factor to consider
+        max_rounds: Highest work factor to consider
+        samples: Number of hashes timed per measurement, the fastest of
+            which is kept
+        apply: Also make the result the work factor of new hashes
+
+    Returns:
+        The chosen number of rounds, min_rounds if even that is too slow
+    """
+    def measure(rounds: int) -> float:
+        salt = bcrypt.gensalt(rounds)
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            bcrypt.hashpw(b'calibration password', salt)
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
+
+    base = measure(min_rounds)
+    rounds = min_rounds
+    while (rounds < max_rounds
+           and base * 2 ** (rounds + 1 - min_rounds) <= target_ms):
+        rounds += 1
+    while rounds > min_rounds and measure(rounds) > target_ms:
+        rounds -= 1
+
+    if apply:
+        set_rounds(rounds)
+    return rounds
+
+
+def is_valid(hashed_password: bytes, password: str,
+             cache: Optional['VerificationCache'] = None) -> bool:
     """
     Verify if a password matches the hashed password.
 
     Args:
         hashed_password: The hashed password (bytes)
         password: The plain text password to verify
+        cache: Cache of recent successful verifications to consult first
+            (default: None, always run bcrypt)
 
     Returns:
         True if the password matches, False otherwise
     """
+    if cache is not None:
+        return cache.is_valid(hashed_password, password)
+
     # Convert password to bytes
     password_bytes = password.encode('utf-8')
 
@@ -47,6 +161,423 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_password)
 
 
+class VerificationCache:
+    """
+    Short-lived memory of successful password verifications.
+
+    Entries are keyed by an HMAC of (hashed_password, password) under a
+    random per-process key, so no plaintext password is kept. Failed
+    checks are never cached, and a changed password has a new hash, so
+    it never matches an old entry.
+    """
+
+    EVICTION_POLICIES = ("lru", "fifo")
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10000,
+                 eviction: str = "lru", key: Optional[bytes] = None):
+        """
+        Initialize an empty cache.
+
+        Args:
+            ttl: Seconds a successful verification is remembered
+            max_entries: Maximum number of remembered verifications
+            eviction: Which entry makes room when the cache is full:
+                the least recently used ("lru") or the oldest ("fifo")
+            key: HMAC key (default: 32 random bytes)
+        """
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"eviction must be one of "
+                             f"{', '.join(self.EVICTION_POLICIES)}")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.eviction = eviction
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.__key = key or os.urandom(32)
+        self.__entries: collections.OrderedDict = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def digest(self, hashed_password: bytes, password: str) -> bytes:
+        """
+        Key of a (hashed_password, password) pair.
+
+        Returns:
+            HMAC-SHA256 of the length-prefixed hash and the password
+        """
+        message = (len(hashed_password).to_bytes(4, 'big')
+                   + hashed_password + password.encode('utf-8'))
+        return hmac.new(self.__key, message, hashlib.sha256).digest()
+
+    def is_valid(self, hashed_password: bytes, password: str) -> bool:
+        """
+        Verify a password, skipping bcrypt if the same pair was verified
+        successfully less than ttl seconds ago.
+
+        Args:
+            hashed_password: The hashed password (bytes)
+            password: The plain text password to verify
+
+        Returns:
+            True if the password matches, False otherwise
+        """
+        digest = self.digest(hashed_password, password)
+        now = time.monotonic()
+        with self.__lock:
+            expires = self.__entries.get(digest)
+            if expires is not None and expires > now:
+                self.hits += 1
+                if self.eviction == "lru":
+                    self.__entries.move_to_end(digest)
+                return True
+            if expires is not None:
+                del self.__entries[digest]
+                self.expirations += 1
+            self.misses += 1
+
+        # Run bcrypt outside the lock
+        if not is_valid(hashed_password, password):
+            return False
+
+        with self.__lock:
+            self.__entries[digest] = time.monotonic() + self.ttl
+            self.__entries.move_to_end(digest)
+            self.__evict()
+        return True
+
+    def __evict(self) -> None:
+        """
+        Drop expired entries at the front, then the first entries while
+        the cache is too large. Must be called with the lock held.
+        """
+        now = time.monotonic()
+        entries = self.__entries
+        while entries:
+            digest, expires = next(iter(entries.items()))
+            if expires > now and len(entries) <= self.max_entries:
+                break
+            del entries[digest]
+            if expires > now:
+                self.evictions += 1
+            else:
+                self.expirations += 1
+
+    def clear(self) -> None:
+        """ Forget every verification """
+        with self.__lock:
+            self.__entries.clear()
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Effectiveness of the cache.
+
+        Returns:
+            Size, hits, misses, hit rate, evictions and expirations
+        """
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.__entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+def verify_and_maybe_rehash(hashed_password: bytes, password: str,
+                            rounds: Optional[int] = None
+                            ) -> Tuple[bool, Optional[bytes]]:
+    """
+    Verify a password and, if it matches a hash made with another work
+    factor, hash it again with the current one.
+
+    Storing the new hash after a successful login rolls a change of work
+    factor out to every active user, without a migration job.
+
+    Args:
+        hashed_password: The stored hashed password (bytes)
+        password: The plain text password to verify
+        rounds: The work factor to move to (default: get_rounds())
+
+    Returns:
+        Whether the password matches, and the hash to store instead of
+        hashed_password, or None if it is already up to date
+    """
+    if not is_valid(hashed_password, password):
+        return False, None
+
+    rounds = rounds or _rounds
+    if hash_rounds(hashed_password) == rounds:
+        return True, None
+    return True, hash_password(password, rounds)
+
+
+class ServiceOverloaded(RuntimeError):
+    """ Raised when a HashingService already has max_pending jobs """
+
+
+class HashingService:
+    """
+    Run bcrypt on a bounded pool of workers, off the calling thread.
+
+    The number of jobs queued or running is capped by max_pending: past
+    it, new jobs are refused with ServiceOverloaded instead of queueing
+    without bound, so a login storm fails fast rather than piling up.
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 use_processes: bool = False,
+                 max_pending: Optional[int] = None):
+        """
+        Initialize the service and its pool.
+
+        Args:
+            workers: Number of workers (default: the number of cores)
+            use_processes: Run bcrypt in processes rather than threads,
+                which bcrypt allows to run in parallel by releasing the GIL
+            max_pending: Maximum number of jobs queued or running
+                (default: 4 per worker)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 4 * self.workers
+        pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self.executor: Executor = pool(self.workers)
+        self.started = time.monotonic()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+        self.__pending = 0
+        self.__lock = threading.Lock()
+
+    def submit(self, function: Callable, *args) -> Future:
+        """
+        Run hash_password or is_valid on the pool.
+
+        Args:
+            function: The function to run
+            args: Its arguments
+
+        Returns:
+            Future of the result
+
+        Raises:
+            ServiceOverloaded: If max_pending jobs are already pending
+        """
+        with self.__lock:
+            if self.__pending >= self.max_pending:
+                self.rejected += 1
+                raise ServiceOverloaded(
+                    f"{self.__pending} password jobs already pending")
+            self.__pending += 1
+            self.submitted += 1
+
+        started = time.monotonic()
+        try:
+            future = self.executor.submit(function, *args)
+        except Exception:
+            with self.__lock:
+                self.__pending -= 1
+            raise
+
+        def done(future: Future) -> None:
+            with self.__lock:
+                self.__pending -= 1
+                self.busy_seconds += time.monotonic() - started
+                if future.cancelled() or future.exception() is not None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+        future.add_done_callback(done)
+        return future
+
+    async def hash_password_async(self, password: str) -> bytes:
+        """
+        Hash a password without blocking the event loop.
+
+        Args:
+            password: The plain text password to hash
+
+        Returns:
+            A salted, hashed password as byte string
+        """
+        # Worker processes keep the work factor they were started with
+        return await asyncio.wrap_future(
+            self.submit(hash_password, password, get_rounds()))
+
+    async def is_valid_async(self, hashed_password: bytes,
+                             password: str) -> bool:
+        """
+        Verify a password without blocking the event loop.
+
+        Args:
+            hashed_password: The hashed password (bytes)
+            password: The plain text password to verify
+
+        Returns:
+            True if the password matches, False otherwise
+        """
+        return await asyncio.wrap_future(
+            self.submit(is_valid, hashed_password, password))
+
+    def map(self, function: Callable, jobs: Iterable[Tuple]) -> List:
+        """
+        Run many jobs, keeping at most max_pending of them in flight.
+
+        Args:
+            function: hash_password or is_valid
+            jobs: Argument tuples of each call
+
+        Returns:
+            The results, in job order
+        """
+        results = []
+        in_flight: collections.deque = collections.deque()
+        for args in jobs:
+            if len(in_flight) >= self.max_pending:
+                results.append(in_flight.popleft().result())
+            while True:
+                try:
+                    in_flight.append(self.submit(function, *args))
+                    break
+                except ServiceOverloaded:
+                    # Make room by waiting for our own oldest job, or for
+                    # other callers' jobs when none of ours are pending
+                    if not in_flight:
+                        time.sleep(0.001)
+                        continue
+                    results.append(in_flight.popleft().result())
+        results.extend(future.result() for future in in_flight)
+        return results
+
+    def hash_many(self, passwords: Iterable[str]) -> List[bytes]:
+        """
+        Hash many passwords in parallel.
+
+        Args:
+            passwords: The plain text passwords
+
+        Returns:
+            Their hashes, in order
+        """
+        rounds = get_rounds()
+        return self.map(hash_password,
+                        ((password, rounds) for password in passwords))
+
+    def verify_many(self,
+                    pairs: Iterable[Tuple[bytes, str]]) -> List[bool]:
+        """
+        Verify many passwords in parallel.
+
+        Args:
+            pairs: (hashed_password, password) pairs
+
+        Returns:
+            Whether each password matches its hash, in order
+        """
+        return self.map(is_valid, pairs)
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Throughput and load of the service since it started.
+
+        Returns:
+            Job counts, pending jobs, completed jobs per second and the
+            average time a job took from submission to completion
+        """
+        with self.__lock:
+            elapsed = time.monotonic() - self.started
+            finished = self.completed + self.failed
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'pending': self.__pending,
+                'per_second': round(self.completed / elapsed, 2)
+                if elapsed else 0.0,
+                'avg_latency_ms': round(
+                    1000 * self.busy_seconds / finished, 2)
+                if finished else 0.0,
+            }
+
+    def close(self) -> None:
+        """ Wait for pending jobs, then stop the workers """
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'HashingService':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_service: Optional[HashingService] = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> HashingService:
+    """
+    Get the shared HashingService, created on first use.
+
+    Returns:
+        The shared service
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = HashingService()
+        return _service
+
+
+async def hash_password_async(password: str) -> bytes:
+    """
+    Hash a password on the shared HashingService.
+
+    Args:
+        password: The plain text password to hash
+
+    Returns:
+        A salted, hashed password as byte string
+    """
+    return await get_service().hash_password_async(password)
+
+
+async def is_valid_async(hashed_password: bytes, password: str) -> bool:
+    """
+    Verify a password on the shared HashingService.
+
+    Args:
+        hashed_password: The hashed password (bytes)
+        password: The plain text password to verify
+
+    Returns:
+        True if the password matches, False otherwise
+    """
+    return await get_service().is_valid_async(hashed_password, password)
+
+
+def verify_many(pairs: Iterable[Tuple[bytes, str]]) -> List[bool]:
+    """
+    Verify many passwords in parallel on the shared HashingService.
+
+    Args:
+        pairs: (hashed_password, password) pairs
+
+    Returns:
+        Whether each password matches its hash, in order
+    """
+    return get_service().verify_many(pairs)
+
+
 # Test the functions
 if __name__ == "__main__":
     password = "MyAmazingPassw0rd"
@@ -56,3 +587,20 @@ if __name__ == "__main__":
 
     # Test with wrong password
     print(is_valid(encrypted_password, "WrongPassword"))
+
+    # Test the hashing service
+    print(asyncio.run(is_valid_async(encrypted_password, password)))
+    print(verify_many([(encrypted_password, password),
+                       (encrypted_password, "WrongPassword")]))
+    print(get_service().metrics())
+
+    # Test cost calibration and rehashing
+    print(calibrate(target_ms=100.0))
+    print(verify_and_maybe_rehash(encrypted_password, password,
+                                  rounds=get_rounds() - 1))
+
+    # Test the verification cache
+    cache = VerificationCache(ttl=5.0, max_entries=100)
+    for _ in range(3):
+        print(is_valid(encrypted_password, password, cache=cache))
+    print(cache.metrics())
@@ -6,18 +6,254 @@ This module provides functionality to obfuscate personally identifiable
 information (PII) in log messages using regular expressions.
 """
 
-import os
 import re
+import sys
+import queue
 import logging
-import mysql.connector
-from typing import List
-from mysql.connector.connection import MySQLConnection
+import logging.handlers
+import functools
+import itertools
+import threading
+import collections
+from concurrent.futures import ProcessPoolExecutor
+from typing import AnyStr, Iterable, Iterator, List, TextIO, Tuple
+from db_pool import PooledConnection, get_pool
 
 
 # PII fields constant - these are the important fields to redact
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
 
 
+class RedactionEngine:
+    """
+    Redact the values of given fields in key=value log messages.
+
+    The pattern is compiled once, for both str and bytes messages. A
+    single re.sub pass then replaces every match with the precomputed
+    "field=redaction" string of its field, found by a dictionary lookup
+    rather than by splitting the match.
+    """
+
+    def __init__(self, fields: Iterable[str], redaction: str = "***",
+                 separator: str = ";"):
+        """
+        Compile the patterns for the given fields.
+
+        Args:
+            fields: Field names whose values are redacted
+            redaction: String to replace field values with
+            separator: Character that separates fields in the message
+        """
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+
+        # One alternation of the field names, captured to look them up
+        names = '|'.join(re.escape(field) for field in self.fields)
+        pattern = f'({names})=[^{re.escape(separator)}]*'
+        self.pattern = re.compile(pattern)
+        self.bytes_pattern = re.compile(pattern.encode('utf-8'))
+
+        # Same, for buffers of messages where values also end at newlines
+        line_pattern = f'({names})=[^{re.escape(separator)}\\n]*'
+        self.line_pattern = re.compile(line_pattern)
+        self.bytes_line_pattern = re.compile(line_pattern.encode('utf-8'))
+
+        # What each field's match is replaced with
+        self.replacements = {
+            field: f'{field}={redaction}' for field in self.fields
+        }
+        self.bytes_replacements = {
+            field.encode('utf-8'): f'{field}={redaction}'.encode('utf-8')
+            for field in self.fields
+        }
+
+    def redact(self, message: str) -> str:
+        """
+        Obfuscate the fields of a log message.
+
+        Args:
+            message: The log message containing field-value pairs
+
+        Returns:
+            The log message with the fields obfuscated
+        """
+        if not self.fields:
+            return message
+        return self.pattern.sub(self.replace, message)
+
+    def redact_bytes(self, message: bytes) -> bytes:
+        """
+        Obfuscate the fields of a UTF-8 encoded log message, without
+        decoding it.
+
+        Args:
+            message: The encoded log message
+
+        Returns:
+            The encoded log message with the fields obfuscated
+        """
+        if not self.fields:
+            return message
+        return self.bytes_pattern.sub(self.replace_bytes, message)
+
+    def redact_buffer(self, buffer: AnyStr) -> AnyStr:
+        """
+        Obfuscate the fields of newline-separated log messages in one pass.
+
+        Args:
+            buffer: The messages joined by newlines, as str or UTF-8 bytes
+
+        Returns:
+            The buffer with the fields of every message obfuscated
+        """
+        if not self.fields:
+            return buffer
+        if isinstance(buffer, bytes):
+            return self.bytes_line_pattern.sub(self.replace_bytes, buffer)
+        return self.line_pattern.sub(self.replace, buffer)
+
+    def redact_chunk(self, messages: List[AnyStr]) -> List[AnyStr]:
+        """
+        Obfuscate a list of log messages with a single substitution over
+        their newline-joined buffer.
+
+        Messages that span several lines cannot be told apart once joined,
+        so a chunk holding any is redacted one message at a time.
+
+        Args:
+            messages: The log messages, all str or all bytes
+
+        Returns:
+            The redacted messages, in order
+        """
+        if not messages:
+            return []
+        newline = b"\n" if isinstance(messages[0], bytes) else "\n"
+        buffer = newline.join(messages)
+        if buffer.count(newline) != len(messages) - 1:
+            if newline == "\n":
+                return [self.redact(message) for message in messages]
+            return [self.redact_bytes(message) for message in messages]
+        return self.redact_buffer(buffer).split(newline)
+
+    def redact_iter(self, messages: Iterable[AnyStr],
+                    chunk_size: int = 1024,
+                    processes: int = None) -> Iterator[AnyStr]:
+        """
+        Lazily obfuscate a stream of log messages, chunk by chunk.
+
+        Args:
+            messages: The log messages, all str or all bytes
+            chunk_size: Number of messages redacted in one pass
+            processes: Redact chunks on a pool of that many processes,
+                keeping two chunks per process in flight (default: None,
+                redact in the calling thread)
+
+        Yields:
+            The redacted messages, in order
+        """
+        messages = iter(messages)
+        chunks = iter(lambda: list(itertools.islice(messages, chunk_size)),
+                      [])
+        if processes is None:
+            for chunk in chunks:
+                yield from self.redact_chunk(chunk)
+            return
+
+        with ProcessPoolExecutor(processes) as pool:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.submit(
+                    redact_chunk, self.fields, self.redaction,
+                    self.separator, chunk))
+                if len(pending) >= 2 * processes:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def redact_batch(self, messages: Iterable[AnyStr],
+                     chunk_size: int = 1024,
+                     processes: int = None) -> List[AnyStr]:
+        """
+        Obfuscate many log messages at once.
+
+        Args:
+            messages: The log messages, all str or all bytes
+            chunk_size: Number of messages redacted in one pass
+            processes: Number of worker processes (default: None)
+
+        Returns:
+            The redacted messages, in order
+        """
+        return list(self.redact_iter(messages, chunk_size, processes))
+
+    def replace(self, match: re.Match) -> str:
+        """Replacement of one str match"""
+        return self.replacements[match[1]]
+
+    def replace_bytes(self, match: re.Match) -> bytes:
+        """Replacement of one bytes match"""
+        return self.bytes_replacements[match[1]]
+
+
+@functools.lru_cache(maxsize=128)
+def get_engine(fields: Tuple[str, ...], redaction: str,
+               separator: str) -> RedactionEngine:
+    """
+    Get the shared RedactionEngine of a (fields, redaction, separator).
+
+    Args:
+        fields: Tuple of field names to obfuscate
+        redaction: String to replace field values with
+        separator: Character that separates fields in the message
+
+    Returns:
+        The RedactionEngine, compiled on first use
+    """
+    return RedactionEngine(fields, redaction, separator)
+
+
+def redact_chunk(fields: Tuple[str, ...], redaction: str, separator: str,
+                 messages: List[AnyStr]) -> List[AnyStr]:
+    """
+    Obfuscate a chunk of log messages in a worker process.
+
+    Args:
+        fields: Tuple of field names to obfuscate
+        redaction: String to replace field values with
+        separator: Character that separates fields in the message
+        messages: The log messages
+
+    Returns:
+        The redacted messages, in order
+    """
+    return get_engine(fields, redaction, separator).redact_chunk(messages)
+
+
+def filter_data(fields: List[str], redaction: str,
+                messages: Iterable[AnyStr], separator: str,
+                lazy: bool = False, **options) -> Iterable[AnyStr]:
+    """
+    Obfuscate specified fields in many log messages.
+
+    Args:
+        fields: List of field names to obfuscate
+        redaction: String to replace field values with
+        messages: The log messages containing field-value pairs
+        separator: Character that separates fields in the message
+        lazy: Return a generator instead of a list
+        options: chunk_size and processes of RedactionEngine.redact_iter
+
+    Returns:
+        The log messages with specified fields obfuscated
+    """
+    engine = get_engine(tuple(fields), redaction, separator)
+    if lazy:
+        return engine.redact_iter(messages, **options)
+    return engine.redact_batch(messages, **options)
+
+
 def filter_datum(fields: List[str], redaction: str, message: str,
                  separator: str) -> str:
     """
@@ -32,14 +268,7 @@ def filter_datum(fields: List[str], redaction: str, message: str,
     Returns:
         The log message with specified fields obfuscated
     """
-    pattern = '|'.join(
-        f'{field}=[^{separator}]*' for field in fields
-    )
-    return re.sub(
-        pattern,
-        lambda m: m.group().split('=')[0] + '=' + redaction,
-        message
-    )
+    return get_engine(tuple(fields), redaction, separator).redact(message)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -58,6 +287,8 @@ class RedactingFormatter(logging.Formatter):
         """
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self.engine = get_engine(tuple(fields), self.REDACTION,
+                                 self.SEPARATOR)
 
     def format(self, record: logging.LogRecord) -> str:
         """
@@ -69,15 +300,169 @@ class RedactingFormatter(logging.Formatter):
         Returns:
             Formatted log record with specified fields redacted
         """
-        record.msg = filter_datum(self.fields, self.REDACTION,
-                                  record.getMessage(), self.SEPARATOR)
+        record.msg = self.engine.redact(record.getMessage())
         return super().format(record)
 
 
-def get_logger() -> logging.Logger:
+class QueuedRedactingHandler(logging.handlers.QueueHandler):
+    """
+    Handler that hands records to a background thread through a bounded
+    queue. The thread redacts them with a RedactingFormatter and writes
+    them to the streams in batches, so logging calls never wait on I/O.
+    Records logged once the handler is closed are dropped.
+    """
+
+    OVERFLOW_POLICIES = ("block", "drop", "sample")
+
+    # Longest wait between two checks that the handler is still open
+    PUT_INTERVAL = 0.1
+
+    def __init__(self, fields: List[str], streams: List[TextIO] = None,
+                 max_queue: int = 10000, overflow: str = "block",
+                 sample_every: int = 10, batch_size: int = 256):
+        """
+        Initialize the handler and start its writer thread.
+
+        Args:
+            fields: List of field names to redact in log messages
+            streams: Streams written to (default: sys.stderr)
+            max_queue: Maximum number of records waiting to be written
+            overflow: What to do with a record when the queue is full:
+                "block" until there is room, "drop" it, or "sample" to
+                block for one record in sample_every and drop the others
+            sample_every: Sampling period of the "sample" policy
+            batch_size: Maximum number of records written at once
+        """
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of "
+                             f"{', '.join(self.OVERFLOW_POLICIES)}")
+        super().__init__(queue.Queue(max_queue))
+        self.redacting_formatter = RedactingFormatter(fields)
+        self.streams = streams if streams is not None else [sys.stderr]
+        self.overflow = overflow
+        self.sample_every = sample_every
+        self.batch_size = batch_size
+        self.overflowed = 0
+        self.dropped = 0
+        self.closed = False
+        self.counters_lock = threading.Lock()
+
+        # Daemon thread, stopped and drained by close()
+        self.writer = threading.Thread(target=self.write_batches,
+                                       name="user_data-writer", daemon=True)
+        self.writer.start()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Queue a record, applying the overflow policy when the queue is full.
+
+        Args:
+            record: LogRecord already prepared for the queue
+        """
+        if self.closed:
+            with self.counters_lock:
+                self.dropped += 1
+            return
+        if self.overflow == "block":
+            self.put_while_open(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.counters_lock:
+                self.overflowed += 1
+                sampled = (self.overflow == "sample"
+                           and self.overflowed % self.sample_every == 0)
+                if not sampled:
+                    self.dropped += 1
+            if sampled:
+                self.put_while_open(record)
+
+    def put_while_open(self, record: logging.LogRecord) -> None:
+        """
+        Queue a record, waiting for room as long as the handler is open,
+        and drop it once the handler is closed.
+
+        Args:
+            record: LogRecord already prepared for the queue
+        """
+        while not self.closed:
+            try:
+                self.queue.put(record, timeout=self.PUT_INTERVAL)
+                return
+            except queue.Full:
+                pass
+        with self.counters_lock:
+            self.dropped += 1
+
+    def write_batches(self) -> None:
+        """
+        Format and write queued records until the stop sentinel arrives.
+        """
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # None is the sentinel queued by close()
+            if None in batch:
+                running = False
+            records = [record for record in batch if record is not None]
+            try:
+                text = "".join(self.redacting_formatter.format(record) + "\n"
+                               for record in records)
+                for stream in self.streams:
+                    stream.write(text)
+                    stream.flush()
+            except Exception:
+                self.handleError(records[0])
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def flush(self) -> None:
+        """
+        Wait until every record queued so far has been written.
+        """
+        if self.writer.is_alive():
+            self.queue.join()
+
+    def close(self) -> None:
+        """
+        Write the records still queued, then stop the writer thread.
+        """
+        self.closed = True
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+
+        # Records queued while closing arrived after the stop sentinel
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.queue.task_done()
+            if record is not None:
+                with self.counters_lock:
+                    self.dropped += 1
+        super().close()
+
+
+def get_logger(queued: bool = False, **options) -> logging.Logger:
     """
     Create and configure a logger for user data.
 
+    Args:
+        queued: Redact and write records on a background thread through
+            a QueuedRedactingHandler instead of on the calling thread
+        options: Keyword arguments of QueuedRedactingHandler, such as
+            max_queue, overflow, sample_every and batch_size
+
     Returns:
         Configured logging.Logger object
     """
@@ -90,6 +475,13 @@ def get_logger() -> logging.Logger:
     # Prevent propagation to other loggers
     logger.propagate = False
 
+    if queued:
+        # Queue records for the writer thread, which logging.shutdown
+        # drains at exit by closing the handler
+        handler = QueuedRedactingHandler(fields=PII_FIELDS, **options)
+        logger.addHandler(handler)
+        return logger
+
     # Create StreamHandler
     handler = logging.StreamHandler()
 
@@ -103,64 +495,141 @@ def get_logger() -> logging.Logger:
     return logger
 
 
-def get_db() -> MySQLConnection:
+def get_db() -> PooledConnection:
     """
-    Connect to the MySQL database using environment variables.
+    Connect to the database using environment variables.
+
+    Connections come from a pool shared by every call, configured from
+    the PERSONAL_DATA_DB_* variables, so closing one gives it back to the
+    pool instead of ending it. When every connection is borrowed, waits
+    at most PERSONAL_DATA_DB_POOL_TIMEOUT seconds for one to be released.
 
     Returns:
-        MySQLConnection object to the database
+        Pooled connection to the database
     """
-    # Get database credentials from environment variables with defaults
-    username = os.getenv('PERSONAL_DATA_DB_USERNAME', 'root')
-    password = os.getenv('PERSONAL_DATA_DB_PASSWORD', '')
-    host = os.getenv('PERSONAL_DATA_DB_HOST', 'localhost')
-    database = os.getenv('PERSONAL_DATA_DB_NAME')
+    pool = get_pool()
+    return pool.acquire(pool.timeout)
 
-    # Check if database name is provided
-    if not database:
-        raise ValueError("PERSONAL_DATA_DB_NAME environment variable is required")
 
-    # Create and return database connection
-    connection = mysql.connector.connect(
-        user=username,
-        password=password,
-        host=host,
-        database=database
-    )
+def export_users(db, logger: logging.Logger = None, batch_size: int = 1000,
+                 query: str = "SELECT * FROM users;") -> int:
+    """
+    Stream the users table to a logger, redacted, batch by batch.
 
-    return connection
+    Rows are read from an unbuffered tuple cursor with fetchmany, so only
+    one batch is held in memory. Each batch is turned into key=value
+    messages with a template built once from the column names. Stream
+    handlers formatting with a RedactingFormatter get each batch redacted
+    in a single pass and written at once, in their format. Every other
+    handler gets one record per row, already redacted unless it redacts
+    records itself, like a QueuedRedactingHandler.
 
+    Args:
+        db: DB-API connection, such as get_db() or a sqlite3 stand-in
+        logger: Logger written to (default: the "user_data" logger, as
+            configured by get_logger)
+        batch_size: Number of rows fetched, redacted and written at once
+        query: Query selecting the rows to export
 
-def main() -> None:
+    Returns:
+        Number of rows exported, 0 if the logger ignores INFO records
     """
-    Main function that retrieves and displays filtered user data from database.
+    logger = logger if logger is not None else logging.getLogger("user_data")
+    if not logger.isEnabledFor(logging.INFO):
+        return 0
+
+    # Handlers the records would reach, split into those written to
+    # directly and those handed LogRecords, with whether they redact
+    direct: List[logging.StreamHandler] = []
+    handlers: List[Tuple[logging.Handler, bool]] = []
+    current = logger
+    while current is not None:
+        for handler in current.handlers:
+            if logging.INFO < handler.level:
+                continue
+            if (type(handler) is logging.StreamHandler
+                    and isinstance(handler.formatter, RedactingFormatter)
+                    and not handler.filters and not logger.filters):
+                direct.append(handler)
+            else:
+                handlers.append((handler, isinstance(
+                    handler, QueuedRedactingHandler) or isinstance(
+                    handler.formatter, RedactingFormatter)))
+        current = current.parent if current.propagate else None
+
+    # Unbuffered tuple cursor, on connections that support the option
+    try:
+        cursor = db.cursor(buffered=False)
+    except TypeError:
+        cursor = db.cursor()
+
+    try:
+        cursor.execute(query)
+
+        # "key1={};key2={};...;" built once from the column names
+        columns = [column[0] for column in cursor.description]
+        template = "".join(
+            f"{column.replace('{', '{{').replace('}', '}}')}={{}};"
+            for column in columns
+        )
+
+        count = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            messages = [template.format(*row) for row in rows]
+
+            # One log line prefix per batch, with the time it was read
+            for handler in direct:
+                record = logger.makeRecord(logger.name, logging.INFO,
+                                           __file__, 0, "", None, None)
+                prefix = handler.format(record)
+                redacted = handler.formatter.engine.redact_chunk(messages)
+                text = "".join(f"{prefix}{message}{handler.terminator}"
+                               for message in redacted)
+                handler.acquire()
+                try:
+                    handler.stream.write(text)
+                finally:
+                    handler.release()
+                handler.flush()
+
+            if handlers:
+                redacted = messages
+                if not all(redacts for _, redacts in handlers):
+                    redacted = get_engine(
+                        tuple(PII_FIELDS), RedactingFormatter.REDACTION,
+                        RedactingFormatter.SEPARATOR).redact_chunk(messages)
+                for message, safe in zip(messages, redacted):
+                    for handler, redacts in handlers:
+                        record = logger.makeRecord(
+                            logger.name, logging.INFO, __file__, 0,
+                            message if redacts else safe, None, None)
+                        if logger.filter(record):
+                            handler.handle(record)
+            count += len(rows)
+    finally:
+        cursor.close()
+    return count
+
+
+def main(db=None) -> None:
     """
-    # Get the logger
-    logger = get_logger()
+    Main function that retrieves and displays filtered user data from database.
 
+    Args:
+        db: Connection to export from (default: get_db())
+    """
     # Get database connection
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-
-    # Execute query to get all users
-    cursor.execute("SELECT * FROM users;")
-
-    # Process each row
-    for row in cursor:
-        # Build log message in key=value format
-        message_parts = []
-        for key, value in row.items():
-            message_parts.append(f"{key}={value}")
-  
-        # Join parts with semicolon separator
-        log_message = ";".join(message_parts) + ";"
-  
-        # Log the filtered message
-        logger.info(log_message)
-
-    # Clean up
-    cursor.close()
-    db.close()
+    if db is None:
+        db = get_db()
+
+    # Stream every user to the log, redacted
+    try:
+        export_users(db, get_logger())
+    finally:
+        db.close()
 
 
 if __name__ == "__main__":
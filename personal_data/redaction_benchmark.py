@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Redaction Benchmark Module
+
+This module times the RedactionEngine against the original filter_datum,
+which builds its pattern and calls a Python function for every match.
+"""
+
+import re
+import random
+import timeit
+from typing import Dict, List
+from filtered_logger import PII_FIELDS, RedactionEngine
+
+
+def filter_datum_per_call(fields: List[str], redaction: str, message: str,
+                          separator: str) -> str:
+    """
+    Obfuscate specified fields in a log message, as filter_datum first did.
+
+    Args:
+        fields: List of field names to obfuscate
+        redaction: String to replace field values with
+        message: The log message containing field-value pairs
+        separator: Character that separates fields in the message
+
+    Returns:
+        The log message with specified fields obfuscated
+    """
+    pattern = '|'.join(
+        f'{field}=[^{separator}]*' for field in fields
+    )
+    return re.sub(
+        pattern,
+        lambda m: m.group().split('=')[0] + '=' + redaction,
+        message
+    )
+
+
+def sample_messages(count: int, seed: int = 0) -> List[str]:
+    """
+    Build log messages shaped like the users table rows.
+
+    Args:
+        count: Number of messages
+        seed: Seed of the random values
+
+    Returns:
+        List of key=value; messages
+    """
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        user = f"user{rng.randrange(10 ** 6)}"
+        messages.append(
+            f"name={user.title()};email={user}@example.com;"
+            f"phone=({rng.randrange(100, 999)}) {rng.randrange(10 ** 7)};"
+            f"ssn={rng.randrange(10 ** 9):09d};password={user[::-1]}x!;"
+            f"ip=10.{i % 256}.{rng.randrange(256)}.{rng.randrange(256)};"
+            f"last_login=2019-11-14T06:16:24;user_agent=Mozilla/5.0;"
+        )
+    return messages
+
+
+def benchmark(count: int = 10000, repeat: int = 5) -> Dict[str, float]:
+    """
+    Time redacting the same messages with each implementation.
+
+    Args:
+        count: Number of messages per run
+        repeat: Number of runs, the fastest of which is kept
+
+    Returns:
+        Microseconds per message for each implementation
+    """
+    messages = sample_messages(count)
+    encoded = [message.encode('utf-8') for message in messages]
+    engine = RedactionEngine(PII_FIELDS, "***", ";")
+
+    # Every implementation must agree before being timed
+    for message, data in zip(messages, encoded):
+        expected = filter_datum_per_call(PII_FIELDS, "***", message, ";")
+        assert engine.redact(message) == expected
+        assert engine.redact_bytes(data) == expected.encode('utf-8')
+    assert engine.redact_batch(messages) == [
+        filter_datum_per_call(PII_FIELDS, "***", message, ";")
+        for message in messages]
+    buffer = "\n".join(messages)
+
+    runs = {
+        'filter_datum_per_call': lambda: [
+            filter_datum_per_call(PII_FIELDS, "***", message, ";")
+            for message in messages],
+        'engine_redact': lambda: [
+            engine.redact(message) for message in messages],
+        'engine_redact_bytes': lambda: [
+            engine.redact_bytes(data) for data in encoded],
+        'engine_redact_batch': lambda: engine.redact_batch(messages),
+        'engine_redact_buffer': lambda: engine.redact_buffer(buffer),
+    }
+
+    results = {}
+    for name, run in runs.items():
+        best = min(timeit.repeat(run, number=1, repeat=repeat))
+        results[name] = round(best / count * 1e6, 3)
+    return results
+
+
+if __name__ == "__main__":
+    for name, micros in benchmark().items():
+        print(f"{name}: {micros} us per message")